@@ -7,6 +7,7 @@ import pandas as pd
 from models.DataManager import DataController
 from components import GitFrame, HomeFrame, TaigaFrame, ReportsFrame
 from models.database.RecordDatabase import RecDB
+from models.database.HttpCache import HttpCache
 
 class Application():
     
@@ -16,7 +17,8 @@ class Application():
         self.prev_tab = None
 
         db = RecDB()
-        dc = DataController(db)
+        http_cache = HttpCache()
+        dc = DataController(db, http_cache)
 
         title = 'Capstone Automation Tool'
         geometry = '1000x800'
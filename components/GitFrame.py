@@ -132,7 +132,11 @@ class ConfigFrame(ttk.Frame):
                 def opt_change(event):
                     val = site_strvar.get()
 
-                    if val != 'None':
+                    graphql_check['state'] = 'normal' if val == 'GitHub' else 'disabled'
+                    if val == 'LocalGit':
+                        token_lbl_strvar.set('Enter the clone directory:')
+                        submit_button['state'] = 'normal'
+                    elif val != 'None':
                         token_lbl_strvar.set(f'Enter the {val} token:')
                         submit_button['state'] = 'normal'
                     else:
@@ -144,6 +148,8 @@ class ConfigFrame(ttk.Frame):
                     site = site_strvar.get()
                     nickname = nickname_entry.get().strip()
                     token = token_entry.get().strip()
+                    host_url = host_entry.get().strip() or None
+                    api_type = 'GraphQL' if site == 'GitHub' and graphql_boolvar.get() else None
 
                     site_valid = site != 'None'
                     token_valid = token and len(token) > 0
@@ -162,7 +168,7 @@ class ConfigFrame(ttk.Frame):
                             if not self.dc.check_if_nickname_exists(nickname):
                                 break
 
-                    res, msg = self.dc.add_git_acct(site, nickname, token)
+                    res, msg = self.dc.add_git_acct(site, nickname, token, host_url, api_type)
                     if res == 'Success':
                         th = threading.Thread(target=lambda: wait_for_repos(nickname), daemon=True)
                         th.start()
@@ -176,7 +182,7 @@ class ConfigFrame(ttk.Frame):
                         messagebox.showerror("Error", msg)
 
                 width = 350
-                height = 200
+                height = 290
                 c_x, c_y = self.parent_frame.get_root_center_coords()
 
                 prompt_window = tk.Toplevel()
@@ -184,7 +190,7 @@ class ConfigFrame(ttk.Frame):
                 prompt_window.geometry(f'{width}x{height}+{c_x - int(width / 2)}+{c_y - int(height / 2)}')
                 prompt_window.grab_set()
                 
-                options = ['None', 'GitHub', 'GitLab']
+                options = ['None', 'GitHub', 'GitLab', 'LocalGit']
                 site_strvar = tk.StringVar()
 
                 token_lbl_strvar = tk.StringVar(value='Enter the token:')
@@ -210,6 +216,17 @@ class ConfigFrame(ttk.Frame):
                 token_entry.grid(row=1, column=0, pady=(0, 5), sticky='w')
                 token_entry_frame.pack(pady=5)
 
+                host_entry_frame = ttk.Frame(prompt_window)
+                host_entry_lbl = ttk.Label(host_entry_frame, text="Host URL (Optional, for self-hosted sites):")
+                host_entry = ttk.Entry(host_entry_frame, width=30)
+                host_entry_lbl.grid(row=0, column=0, pady=(5, 2), sticky='w')
+                host_entry.grid(row=1, column=0, pady=(0, 5), sticky='w')
+                host_entry_frame.pack(pady=5)
+
+                graphql_boolvar = tk.BooleanVar(value=False)
+                graphql_check = ttk.Checkbutton(prompt_window, text='Use the GitHub GraphQL API', variable=graphql_boolvar, state='disabled')
+                graphql_check.pack()
+
                 # Submit button
                 submit_button = ttk.Button(prompt_window, text="Submit", state='disabled', command=submit_entry)
                 submit_button.pack(pady=10)
@@ -593,7 +610,10 @@ class DataFrame(ttk.Frame):
         self.build_dropdowns()
 
     def save_data(self):
-        self.dc.update_commit_df(self.curr_commits_df)
+        try:
+            self.dc.update_commit_df(self.curr_commits_df)
+        except Exception as e:
+            messagebox.showerror('Error', f'Failed to save commit data - {e}')
 
     def clear_data(self):
         ans = messagebox.askquestion(title='Delete All Commit Data', message='Are you sure?')
@@ -521,29 +521,21 @@ class DataFrame(ttk.Frame):
                 filters_applied = [filter_obj.filter_applied() for filter_obj in self.filters]
 
                 if True in filters_applied:
-                    rows = []
-                    for rn, row in enumerate(self.report_sheet.data):
-                        row_match = True
-
-                        if row_match and filters_applied[0] and row[hdr2idx['repo_name']] != repo_opt_sel.get_selection():
-                            row_match = False
-
-                        if row_match and filters_applied[1]:
-                            val = row[hdr2idx['task_num']] if row[hdr2idx['task_num']] != '' else 'Not Set'
-                            if val != task_opt_sel.get_selection():
-                                row_match = False
-
-                        if row_match and filters_applied[2] and row[hdr2idx['committer']] != member_opt_sel.get_selection():
-                            row_match = False
-
-                        if row_match and filters_applied[3] and pd.Timestamp(row[hdr2idx['az_date']]) < pd.Timestamp(after_date_filter.get_date_val()):
-                            row_match = False
-
-                        if row_match and filters_applied[4] and pd.Timestamp(row[hdr2idx['az_date']]) > pd.Timestamp(before_date_filter.get_date_val()):
-                            row_match = False
-
-                        if row_match:
-                            rows.append(rn)
+                    # The filters run as one query on the stored commits, which is answered from the commit indexes
+                    conditions = dict()
+                    if filters_applied[0]:
+                        conditions['repo_name'] = repo_opt_sel.get_selection()
+                    if filters_applied[1]:
+                        task = task_opt_sel.get_selection()
+                        conditions['task_num'] = int(task) if task != 'Not Set' else None
+                    if filters_applied[2]:
+                        committer = member_opt_sel.get_selection()
+                        conditions['committer'] = committer if committer != 'Unknown' else None
+                    after_date = after_date_filter.get_date_val() if filters_applied[3] else None
+                    before_date = before_date_filter.get_date_val() if filters_applied[4] else None
+
+                    keys = self.dc.get_commit_keys(conditions, after_date, before_date)
+                    rows = [rn for rn, row in enumerate(self.report_sheet.data) if (str(row[hdr2idx['id']]), row[hdr2idx['repo_name']]) in keys]
 
                     self.report_sheet.display_rows(rows=rows, all_displayed=False, redraw=True)
                     clear_filters_btn['state'] = 'normal'
@@ -695,14 +687,13 @@ class DataFrame(ttk.Frame):
             if committer is not None:
                 gen_report_btn['state'] = 'normal'
 
-        def generate_report(icr_df: pd.DataFrame):
+        def generate_report():
+            # The commits are narrowed down by a query on the stored commits before the report rows are built
             committer = member_strvar.get()
-            if committer != 'ALL':
-                icr_df = icr_df[icr_df['Committer'] == committer]
-            if start_date.date_selected():
-                icr_df = icr_df[pd.to_datetime(icr_df['Commit Date']) >= pd.to_datetime(start_date.get_date_val())]
-            if end_date.date_selected():
-                icr_df = icr_df[pd.to_datetime(icr_df['Commit Date']) <= pd.to_datetime(end_date.get_date_val())]
+            conditions = {'committer': committer} if committer != 'ALL' else None
+            after_date = start_date.get_date_val() if start_date.date_selected() else None
+            before_date = end_date.get_date_val() if end_date.date_selected() else None
+            icr_df = self.dc.format_icr_df_non_excel(self.dc.filter_commits(commits_df, conditions, after_date, before_date), taiga_df)
 
             prompt_window.destroy()  
             self.build_icr_display(icr_df)
@@ -728,11 +719,9 @@ class DataFrame(ttk.Frame):
             self.cancel_report()
             return
         
-        icr_df = self.dc.format_icr_df_non_excel(commits_df, taiga_df)
-
         ## Filter Variables:
         member_strvar = StringVar()
-        member_opts = icr_df['Committer'].dropna().drop_duplicates().to_list()
+        member_opts = commits_df['committer'].dropna().drop_duplicates().to_list()
 
         filter_frame = ttk.Frame(prompt_window)
 
@@ -751,7 +740,7 @@ class DataFrame(ttk.Frame):
         start_date.grid(row=1, column=1, pady=5, sticky='w')
         end_date.grid(row=2, column=1, pady=5, sticky='w')
 
-        gen_report_btn = ttk.Button(prompt_window, text='Generate IC Report', state='disabled', command=lambda: generate_report(icr_df))
+        gen_report_btn = ttk.Button(prompt_window, text='Generate IC Report', state='disabled', command=generate_report)
 
         filter_frame.pack()
         gen_report_btn.pack(pady=10)
@@ -75,7 +75,7 @@ class ConfigFrame(ttk.Frame):
         temp_lbl.pack()
 
         try:
-            result, msg = self.dc.taiga_import_by_api()
+            result, msg = self.dc.taiga_import_by_api(incremental=True)
         except:
             messagebox.showerror('ERROR', 'Failed to import Taiga data by API')
 
@@ -662,8 +662,11 @@ class DataFrame(ttk.Frame):
         
 
     def save_data(self):
-        self.dc.update_us_df(self.curr_us_df)
-        self.dc.update_tasks_df(self.curr_tasks_df, ['task_num', 'us_num', 'is_coding', 'is_complete', 'assignee', 'task_subject'])
+        try:
+            self.dc.update_us_df(self.curr_us_df)
+            self.dc.update_tasks_df(self.curr_tasks_df, ['task_num', 'us_num', 'is_coding', 'is_complete', 'assignee', 'task_subject'])
+        except Exception as e:
+            messagebox.showerror('ERROR', f'Failed to save Taiga data - {e}')
 
     def clear_data(self):
         ans = messagebox.askquestion(title='Delete All Taiga Data', message='Are you sure?')
@@ -0,0 +1,27 @@
+import pandas as pd
+
+## Matches references such as 'task-12', 'Task #12' or 'task12' and captures the task number
+task_pattern = r'(?i)task[^a-zA-Z\d\s]?(\d+)'
+local_tz = 'US/Arizona'
+commit_columns = ['id', 'repo_name', 'host_site', 'task_num', 'committer', 'az_date', 'utc_datetime', 'commit_message', 'commit_url']
+
+def format_commit_df(raw_df: pd.DataFrame, repo_name, host_site) -> pd.DataFrame:
+    if raw_df is None or len(raw_df) == 0:
+        return pd.DataFrame(columns=commit_columns)
+
+    # Takes the commit timezone (UTC) and converts to AZ timezone for the whole column at once
+    utc_dt = pd.to_datetime(raw_df['commit_date'], format='ISO8601', utc=True)
+    task_num = pd.to_numeric(raw_df['commit_message'].str.extract(task_pattern, expand=False))
+
+    df = pd.DataFrame({
+        'id': raw_df['id'],
+        'repo_name': repo_name,
+        'host_site': host_site,
+        'task_num': task_num.astype(pd.Int64Dtype()),
+        'committer': raw_df['committer'],
+        'az_date': utc_dt.dt.tz_convert(local_tz).dt.strftime('%m/%d/%Y'),
+        'utc_datetime': utc_dt,
+        'commit_message': raw_df['commit_message'],
+        'commit_url': raw_df['commit_url']
+    })
+    return df.reset_index(drop=True)
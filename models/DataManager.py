@@ -5,16 +5,22 @@ import openpyxl as opyxl
 import pandas as pd
 import numpy as np
 from typing import Type
+from datetime import datetime, timezone, timedelta
 from openpyxl import styles
 from models.Taiga import TaigaDataServicer
 from models.GitServicerInterface import GitServicer
+from models.GitHub import github_api_url
+from models.CommitFormatter import local_tz
 from models.database.RecordDatabase import RecDB
+from models.database.HttpCache import HttpCache
+from models.HttpClient import HttpClient
 import requests
 import http.client as hc
 
 TAIGA = 'Taiga'
 GITHUB = 'GitHub'
 GITLAB = 'GitLab'
+LOCALGIT = 'LocalGit'
 
 class DataController:
     config_fp = os.path.join(os.getcwd(), 'config.txt')
@@ -23,9 +29,11 @@ class DataController:
     gh_auth_verified = False
     gh_repo_verified = False
 
-    def __init__(self, db: RecDB):
+    def __init__(self, db: RecDB, http_cache: HttpCache = None, http_client: HttpClient = None):
         ## Class object defaults
         self.db : RecDB = None
+        self.http_cache : HttpCache = None
+        self.http_client : HttpClient = None
 
         ## Data Servicers
         self.ts : TaigaDataServicer = None
@@ -60,6 +68,8 @@ class DataController:
 
         ## Instance initializations and data loading
         self.db = db
+        self.http_cache = http_cache
+        self.http_client = http_client or HttpClient()
         self.ts = self._init_taiga_servicer()
         self.gs = self._init_git_servicer()
 
@@ -80,14 +90,15 @@ class DataController:
                     pass
 
         def load_saved_taiga_data():
-            self._update_sprints_df(self.db.table_to_df('sprints'))
-            self._update_members_df(self.db.table_to_df('members'))
-            self.update_us_df(self.db.table_to_df('userstories'))
-            self.update_tasks_df(self.db.table_to_df('tasks'))
+            # The frames are read straight from their tables, so there is nothing to write back
+            self._update_sprints_df(self.db.table_to_df('sprints'), store=False)
+            self._update_members_df(self.db.table_to_df('members'), store=False)
+            self.update_us_df(self.db.table_to_df('userstories'), store=False)
+            self.update_tasks_df(self.db.table_to_df('tasks'), store=False)
 
         load_taiga_projects()
         load_saved_taiga_data()
-        return TaigaDataServicer(self.load_taiga_credentials())
+        return TaigaDataServicer(self.load_taiga_credentials(), http_cache=self.http_cache, http_client=self.http_client)
     
     def _init_git_servicer(self) -> GitServicer:
         def load_accts():
@@ -106,12 +117,14 @@ class DataController:
                     nickname = row['nickname']
                     user = row['username']
                     token = row['site_token']
+                    host_url = row['host_url'] if not pd.isna(row['host_url']) else None
+                    api_type = row['api_type'] if not pd.isna(row['api_type']) else None
 
-                    res, msg = self._validate_token(site, token)
+                    res, msg = self._validate_token(site, token, host_url)
 
                     if res == 'Success':
                         details = "Ready to make API calls"
-                        gs.init_git_servicer(site, nickname, token)
+                        gs.init_git_servicer(site, nickname, token, host_url, api_type)
                     else:
                         details = msg
 
@@ -119,6 +132,8 @@ class DataController:
                         'site': site,
                         'user': user,
                         'token': token,
+                        'host_url': host_url,
+                        'api_type': api_type,
                         'details': details
                     }
         
@@ -128,9 +143,10 @@ class DataController:
                 self.repos = repos
         
         def load_commit_data():
-            self.update_commit_df(self.db.table_to_df('commits'))
+            # The frame is read straight from its table, so there is nothing to write back
+            self.update_commit_df(self.db.table_to_df('commits'), store=False)
 
-        gs = GitServicer()
+        gs = GitServicer(http_cache=self.http_cache, http_client=self.http_client)
         load_repos()
         load_accts()
         load_commit_data()
@@ -140,9 +156,9 @@ class DataController:
     ## Util Functions
     ##=============================================================================
 
-    def _validate_token(self, site, token):
+    def _validate_token(self, site, token, host_url=None):
         def gh_request(token):
-            base_url = "https://api.github.com/user"
+            base_url = f'{github_api_url(host_url)}/user'
             header = {
                 'Accept': 'application/vnd.github+json',
                 'Authorization': f'Bearer {token}',
@@ -152,13 +168,19 @@ class DataController:
             return base_url, header
         
         def gl_request(token):
-            base_url = 'https://gitlab.com/api/v4/user'
+            base_url = f"{host_url.rstrip('/') if host_url else 'https://gitlab.com'}/api/v4/user"
             header = {
                 'PRIVATE-TOKEN': f'{token}'
             }
 
             return base_url, header
 
+        if site == LOCALGIT:
+            # Local accounts point at a directory of clones instead of holding an API token
+            if not os.path.isdir(token):
+                return 'Error', f'Directory not found - {token}'
+            return 'Success', os.path.basename(os.path.abspath(token))
+
         if site == GITHUB:
             url, headers = gh_request(token)
             login_key = 'login'
@@ -167,7 +189,7 @@ class DataController:
             login_key = 'username'
 
         try:
-            res = requests.get(url=url, headers=headers)
+            res = self.http_client.get(url, headers=headers)
             sc = res.status_code
 
             if sc >= 200 and sc <= 200:
@@ -197,8 +219,13 @@ class DataController:
                 return True
         return False
     
-    def update_git_acct(self, site, nickname, token):
-        res, msg = self._validate_token(site, token)
+    def update_git_acct(self, site, nickname, token, host_url=None, api_type=None):
+        # Editing an account keeps the host and API it was added with
+        if nickname in self.git_accts.keys():
+            host_url = host_url or self.git_accts[nickname].get('host_url')
+            api_type = api_type or self.git_accts[nickname].get('api_type')
+
+        res, msg = self._validate_token(site, token, host_url)
         if res == 'Error':
             return res, msg
         
@@ -211,30 +238,35 @@ class DataController:
             'site_name': site,
             'username': enc_uname,
             'nickname': nickname,
-            'site_token': enc_token
+            'site_token': enc_token,
+            'host_url': host_url,
+            'api_type': api_type
         }
 
-        cond = {'nickname': nickname}
-        self.db.insert('sites', data, cond)
+        self.db.upsert('sites', data, ['nickname'])
 
         if nickname in self.git_accts.keys():
             self.git_accts[nickname]['user'] = username
             self.git_accts[nickname]['token'] = token
+            self.git_accts[nickname]['host_url'] = host_url
+            self.git_accts[nickname]['api_type'] = api_type
             self.git_accts[nickname]['details'] = "Ready to make API calls"
         else:
             self.git_accts[nickname] = {
                 'site': site,
                 'user': username,
                 'token': token,
+                'host_url': host_url,
+                'api_type': api_type,
                 'details': "Ready to make API calls"
             }
 
         return res, msg
     
-    def add_git_acct(self, site, nickname, token):
-        res, msg = self.update_git_acct(site, nickname, token)
+    def add_git_acct(self, site, nickname, token, host_url=None, api_type=None):
+        res, msg = self.update_git_acct(site, nickname, token, host_url, api_type)
         if res == 'Success':
-            self.gs.init_git_servicer(site, nickname, token)
+            self.gs.init_git_servicer(site, nickname, token, host_url, api_type)
         return res, msg
     
     def remove_git_acct(self, nickname):
@@ -242,8 +274,11 @@ class DataController:
         self.gs.remove_servicer(nickname)
         self.git_accts.pop(nickname)
         self.repos = self.repos[self.repos['site_nickname'] != nickname]
-        self.db.delete('sites', conditions={'nickname': nickname})
-        self.db.delete('repos', conditions={'site_nickname': nickname})
+        with self.db.batch():
+            self.db.delete('sites', conditions={'nickname': nickname})
+            self.db.delete('repos', conditions={'site_nickname': nickname})
+            self.db.delete('repo_branches', conditions={'site_nickname': nickname})
+            self.db.delete('commit_import_cursors', conditions={'site_nickname': nickname})
     
     def get_git_accts(self):
         accts = []
@@ -275,6 +310,12 @@ class DataController:
     def repos_linked(self) -> bool:
         return len(self.get_linked_repos()) > 0
     
+    def get_http_cache_stats(self) -> dict | None:
+        return self.http_cache.get_stats() if self.http_cache is not None else None
+    
+    def get_http_metrics(self) -> dict:
+        return self.http_client.get_metrics()
+    
     def api_call_ready(self) -> bool:
         if self.repos_linked:
             for acct in self.git_accts.keys():
@@ -342,7 +383,7 @@ class DataController:
         }
 
         try:
-            response = requests.post(url, json=data)
+            response = self.http_client.post(url, json=data)
             if response.status_code == 200:
                 auth_token = response.json().get("auth_token")
                 self.ts.update_user_credentials(username, password, auth_token)
@@ -365,7 +406,10 @@ class DataController:
                 self.taiga_projects_df.loc[self.taiga_projects_df['is_selected'] == 1, 'is_selected'] = 0 
 
             self.taiga_projects_df.loc[self.taiga_projects_df['project_name'] == project, 'is_selected'] = 1
-            self.db.df_to_table('taiga_projects', self.taiga_projects_df)
+            try:
+                self.db.df_to_table('taiga_projects', self.taiga_projects_df)
+            except Exception as e:
+                return "Error", f"Failed to link project '{project}' - {e}"
             self._set_linked_taiga_project(sel_row['id'].iloc[0], sel_row['project_name'].iloc[0], sel_row['project_owner'].iloc[0], sel_row['project_slug'].iloc[0])
             return "Success", f"Successfully linked project '{project}'"
         else:
@@ -385,8 +429,11 @@ class DataController:
         self.us_report_url = us_url if us_url != 'NULL' else None
         self.task_report_url = task_url if task_url != 'NULL' else None
 
-        return self.db.update('taiga_csv_urls', {'durl': us_url}, {'dname': 'user_story'}) \
-            and self.db.update('taiga_csv_urls', {'durl': task_url}, {'dname': 'task'})
+        # Validators saved for the old URLs do not describe the new reports
+        no_validators = {'etag': None, 'last_modified': None, 'content_hash': None}
+        with self.db.batch():
+            return self.db.update('taiga_csv_urls', {'durl': us_url} | no_validators, {'dname': 'user_story'}) \
+                and self.db.update('taiga_csv_urls', {'durl': task_url} | no_validators, {'dname': 'task'})
     
     def get_taiga_csv_urls(self):
         us_url = task_url = None
@@ -401,10 +448,28 @@ class DataController:
             
         return us_url, task_url
     
+    def _get_taiga_report_validators(self) -> dict[str:dict]:
+        validators = dict()
+        for durl, etag, last_modified, content_hash in self.db.select('taiga_csv_urls', ['durl', 'etag', 'last_modified', 'content_hash']):
+            if durl is not None:
+                validators[durl] = {'etag': etag, 'last_modified': last_modified, 'content_hash': content_hash}
+        return validators
+
+    def _save_taiga_report_validators(self, validators : dict[str:dict]):
+        with self.db.batch():
+            for durl, validator in validators.items():
+                self.db.update('taiga_csv_urls', validator, {'durl': durl})
+
+    def _reset_taiga_report_validators(self):
+        # Once the stored data stops matching the reports, the next URL import has to rewrite it even if they are unchanged
+        self.db.update('taiga_csv_urls', {'etag': None, 'last_modified': None, 'content_hash': None})
+
     def clear_taiga_data(self):
-        tables = ['members', 'sprints', 'userstories', 'tasks']
-        for name in tables:
-            self.db.clear_table(name)
+        tables = ['members', 'sprints', 'userstories', 'tasks', 'taiga_sync']
+        with self.db.batch():
+            for name in tables:
+                self.db.clear_table(name)
+            self._reset_taiga_report_validators()
 
         self.sprints_df = self.members_df = self.us_df \
             = self.tasks_df = None
@@ -454,9 +519,13 @@ class DataController:
     
     def clear_commit_data(self):
         self.commits_df = None
-        for repo in self.repos['repo_name'].tolist():
-            self._update_latest_commit_date(repo, None)
-        self.db.clear_table('commits')
+        if self.repos is not None and len(self.repos) > 0:
+            self.repos['last_commit_dt'] = None
+            self._update_repos(self.repos, cols=['last_commit_dt'])
+        with self.db.batch():
+            self.db.clear_table('commits')
+            self.db.clear_table('commit_import_cursors')
+            self.db.clear_table('repo_branches')
 
     def get_commits_df(self):
         return self.commits_df
@@ -471,17 +540,91 @@ class DataController:
             if pd.isna(latest_dt):
                 latest_dt = None
 
-            for res, data in self.gs.import_commit_data(nname, repo, repo_id, latest_dt):
+            # Once branch tips are stored the servicer only fetches commits between the old and new tip of each
+            # changed branch, so the date filter (which would miss older commits on new branches) is not needed
+            branch_tips = self._get_branch_tips(nname, repo)
+            since = latest_dt if len(branch_tips) == 0 else None
+
+            # Each page is written to the commits table as soon as it arrives, along with a cursor that
+            # lets an interrupted import pick up from the last page it stored
+            resume = self._get_import_cursors(nname, repo)
+            for res, data in self.gs.import_commit_data(nname, repo, repo_id, since, stream=True, resume=resume, branch_tips=branch_tips):
                 if res == 'In Progress':
                     yield res, f'[{nname}] {data}'
+                elif res == 'Page':
+                    df, cursor = data
+                    # The page and its cursor are stored together, so a cursor never points past commits that were lost
+                    with self.db.batch():
+                        if df is not None and len(df) > 0:
+                            self.db.upsert_df('commits', self._format_commit_df(df), ['id', 'repo_name'])
+                        self._save_import_cursor(nname, repo, cursor)
                 elif res == 'Complete':
-                    df = data[1]
-                    if df is not None and len(df) > 0:
-                        self.update_commit_df(df)
-                        latest_commit_date = df['utc_datetime'].max()
+                    latest_commit_date = self._get_stored_latest_commit_date(repo)
+                    if latest_commit_date is not None:
                         latest_commit_str = latest_commit_date.strftime('%Y-%m-%dT%H:%M:%SZ')
                         self._update_latest_commit_date(repo, latest_commit_str)
+                    with self.db.batch():
+                        if len(data) > 2 and data[2] is not None:
+                            self._save_branch_tips(nname, repo, data[2])
+                        self.db.delete('commit_import_cursors', {'repo_name': repo, 'site_nickname': nname})
                     yield res, f'[{nname}] {data[0]}'
+
+        self.commits_df = self._format_commit_df(self.db.table_to_df('commits'))
+        self.commit_data_available = self.commits_df is not None and len(self.commits_df) > 0
+    
+    def _get_import_cursors(self, nickname, repo) -> dict:
+        cursors = dict()
+        rows = self.db.select('commit_import_cursors', ['branch', 'tip_sha', 'from_sha', 'next_page'], {'repo_name': repo, 'site_nickname': nickname})
+        for branch, tip, from_sha, next_page in rows or []:
+            cursors[branch] = {'tip': tip, 'from': from_sha, 'next_page': next_page}
+        return cursors
+    
+    def _save_import_cursor(self, nickname, repo, cursor):
+        data = {
+            'repo_name': repo,
+            'site_nickname': nickname,
+            'branch': cursor['branch'],
+            'tip_sha': cursor['tip'],
+            'from_sha': cursor.get('from'),
+            'next_page': cursor['next_page']
+        }
+        self.db.upsert('commit_import_cursors', data, ['repo_name', 'site_nickname', 'branch'])
+    
+    def _get_branch_tips(self, nickname, repo) -> dict:
+        rows = self.db.select('repo_branches', ['branch', 'tip_sha'], {'repo_name': repo, 'site_nickname': nickname})
+        return {branch: tip for branch, tip in rows or []}
+    
+    def _save_branch_tips(self, nickname, repo, branch_dict):
+        # Branches deleted on the remote are dropped so a recreated branch is treated as new
+        self.db.delete('repo_branches', {'repo_name': repo, 'site_nickname': nickname})
+        if len(branch_dict) > 0:
+            df = pd.DataFrame({
+                'repo_name': repo,
+                'site_nickname': nickname,
+                'branch': list(branch_dict.keys()),
+                'tip_sha': list(branch_dict.values()),
+                'last_sync_dt': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            })
+            self.db.upsert_df('repo_branches', df, ['repo_name', 'site_nickname', 'branch'])
+    
+    def get_commit_keys(self, conditions=None, after_date=None, before_date=None) -> set[tuple[str, str]]:
+        # Returns the (id, repo_name) of the stored commits that match conditions and fall on or between the given
+        # local days. The days are turned into the UTC range that the indexed utc_datetime column is stored in
+        start = pd.Timestamp(after_date).tz_localize(local_tz) if after_date is not None else None
+        end = (pd.Timestamp(before_date) + pd.Timedelta(days=1)).tz_localize(local_tz) if before_date is not None else None
+        rows = self.db.select_between('commits', 'utc_datetime', start, end, conditions, ['id', 'repo_name'])
+        return {(str(commit_id), repo) for commit_id, repo in rows or []}
+
+    def filter_commits(self, commits_df : pd.DataFrame, conditions=None, after_date=None, before_date=None) -> pd.DataFrame:
+        keys = self.get_commit_keys(conditions, after_date, before_date)
+        in_keys = pd.MultiIndex.from_arrays([commits_df['id'].astype(str), commits_df['repo_name']]).isin(list(keys))
+        return commits_df[in_keys].reset_index(drop=True)
+
+    def _get_stored_latest_commit_date(self, repo):
+        result = self.db.select('commits', ['MAX(utc_datetime)'], {'repo_name': repo})
+        if result and result[0][0] is not None:
+            return pd.to_datetime(result[0][0], utc=True)
+        return None
     
     ## Data Manipulation
     ##=============================================================================
@@ -531,10 +674,10 @@ class DataController:
             self.db.df_to_table('taiga_projects', self.taiga_projects_df)
             self.taiga_projects_df = format_df(self.db.table_to_df('taiga_projects'))
 
-    def _update_sprints_df(self, new_df: pd.DataFrame):
+    def _update_sprints_df(self, new_df: pd.DataFrame, store=True):
         def to_table_format(df: pd.DataFrame) -> pd.DataFrame:
-            df['sprint_start'] = pd.to_datetime(df['sprint_start']).dt.strftime('%m/%d/%Y')
-            df['sprint_end'] = pd.to_datetime(df['sprint_end']).dt.strftime('%m/%d/%Y')
+            df['sprint_start'] = pd.to_datetime(df['sprint_start']).dt.strftime('%Y-%m-%d')
+            df['sprint_end'] = pd.to_datetime(df['sprint_end']).dt.strftime('%Y-%m-%d')
             return df
 
         def format_df(df: pd.DataFrame) -> pd.DataFrame:
@@ -550,11 +693,12 @@ class DataController:
 
         if new_df is not None and len(new_df) > 0:
             self.sprints_df = self.update_df(self.sprints_df, format_df(new_df))
-            self.db.df_to_table('sprints', to_table_format(self.sprints_df))
-            self.sprints_df = format_df(self.db.table_to_df('sprints'))
+            if store:
+                self.db.df_to_table('sprints', to_table_format(self.sprints_df))
+                self.sprints_df = format_df(self.db.table_to_df('sprints'))
 
 
-    def _update_members_df(self, new_df: pd.DataFrame):
+    def _update_members_df(self, new_df: pd.DataFrame, store=True):
         def format_df(df: pd.DataFrame) -> pd.DataFrame:
             self._inv_val_format(df)
             df['id'] = df['id'].astype(pd.Int64Dtype())
@@ -566,10 +710,11 @@ class DataController:
         
         if new_df is not None and len(new_df) > 0:
             self.members_df = self.update_df(self.members_df, format_df(new_df), 'username')
-            self.db.df_to_table('members', self.members_df)
-            self.members_df = format_df(self.db.table_to_df('members'))
+            if store:
+                self.db.df_to_table('members', self.members_df)
+                self.members_df = format_df(self.db.table_to_df('members'))
     
-    def update_us_df(self, new_df: pd.DataFrame, cols=None):
+    def update_us_df(self, new_df: pd.DataFrame, cols=None, store=True):
         def format_df(df: pd.DataFrame) -> pd.DataFrame:
             self._inv_val_format(df)
             df['id'] = df['id'].astype(pd.Int64Dtype())
@@ -585,12 +730,13 @@ class DataController:
         
         if new_df is not None and len(new_df) > 0:
             self.us_df = self.update_df(self.us_df, format_df(new_df))
-            self.db.df_to_table('userstories', self.us_df)
-            self.us_df = format_df(self.db.table_to_df('userstories'))
+            if store:
+                self.db.df_to_table('userstories', self.us_df)
+                self.us_df = format_df(self.db.table_to_df('userstories'))
 
         self.taiga_data_available = self.us_df is not None and len(self.us_df) > 0 and self.tasks_df is not None and len(self.tasks_df) > 0
 
-    def update_tasks_df(self, new_df: pd.DataFrame, cols=['task_num', 'is_complete', 'us_num', 'assignee', 'task_subject']):
+    def update_tasks_df(self, new_df: pd.DataFrame, cols=['task_num', 'is_complete', 'us_num', 'assignee', 'task_subject'], store=True):
         def format_df(df: pd.DataFrame) -> pd.DataFrame:
             df['id'] = df['id'].astype(pd.Int64Dtype())
             df['task_num'] = df['task_num'].astype(pd.Int64Dtype())
@@ -606,8 +752,9 @@ class DataController:
         
         if new_df is not None and len(new_df) > 0:
             self.tasks_df = self.update_df(self.tasks_df, format_df(new_df), cols=cols)
-            self.db.df_to_table('tasks', self.tasks_df)
-            self.tasks_df = format_df(self.db.table_to_df('tasks'))
+            if store:
+                self.db.df_to_table('tasks', self.tasks_df)
+                self.tasks_df = format_df(self.db.table_to_df('tasks'))
 
         self.taiga_data_available = self.us_df is not None and len(self.us_df) > 0 and self.tasks_df is not None and len(self.tasks_df) > 0
 
@@ -631,20 +778,66 @@ class DataController:
         self.update_us_df(us_df)
         self.update_tasks_df(tasks_df)
 
-    def taiga_import_by_api(self):
+    def _taiga_paginate(self) -> bool:
+        # Stories and tasks are fetched page by page, with the pages requested concurrently, unless the project is
+        # known to fit in a single page. Before the first import its size is unknown, and the first page reports it
+        sizes = [len(df) for df in (self.us_df, self.tasks_df) if df is not None]
+        return len(sizes) < 2 or max(sizes) > self.ts.page_size
+
+    def taiga_import_by_api(self, paginate=None, incremental=False):
         if self.project_selected and self.ts.token_set():
             try:
-                sprints_df, members_df, us_df, task_df = self.ts.import_data_by_api(self.sel_pid)
+                if paginate is None:
+                    paginate = self._taiga_paginate()
+                # A delta sync only asks for stories and tasks modified since the previous sync started
+                last_sync = self._get_taiga_last_sync(self.sel_pid) if incremental and self.us_df is not None else None
+                sync_start = datetime.now(timezone.utc)
+
+                sprints_df, members_df, us_df, task_df = self.ts.import_data_by_api(self.sel_pid, paginate, last_sync, self.us_df if last_sync else None)
                 self._process_taiga_data(sprints_df, members_df, us_df, task_df)
+                self._reset_taiga_report_validators()
+                if last_sync is not None:
+                    self._remove_deleted_taiga_items()
+
+                self._save_taiga_last_sync(self.sel_pid, sync_start)
                 return 'Success', f'Successfully imported Taiga data by API'
             except Exception as e:
                 return 'Error', f'Failed to import Taiga data by API - {e}'
 
+    def _get_taiga_last_sync(self, project_id) -> str | None:
+        result = self.db.select('taiga_sync', ['last_sync_dt'], {'project_id': int(project_id)})
+        return result[0][0] if result else None
+
+    def _save_taiga_last_sync(self, project_id, sync_start : datetime):
+        # Items edited while the previous sync was running are picked up again by starting the next window a little early
+        sync_dt = (sync_start - timedelta(minutes=5)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.db.upsert('taiga_sync', {'project_id': int(project_id), 'last_sync_dt': sync_dt}, ['project_id'])
+
+    def _remove_deleted_taiga_items(self):
+        # Deleted items never show up as modified, so stored ids are checked against the ids Taiga still has
+        def remove_deleted(df : pd.DataFrame, entity, table) -> pd.DataFrame:
+            if df is not None:
+                remote_ids = self.ts.get_entity_ids(self.sel_pid, entity, len(df))
+                if remote_ids is not None:
+                    df = df[df['id'].isin(remote_ids)].reset_index(drop=True)
+                    self.db.df_to_table(table, df)
+            return df
+
+        self.us_df = remove_deleted(self.us_df, 'userstories', 'userstories')
+        self.tasks_df = remove_deleted(self.tasks_df, 'tasks', 'tasks')
+
+    def get_taiga_import_timings(self) -> dict:
+        return self.ts.get_endpoint_timings()
+
     def taiga_import_by_urls(self, us_url, tasks_url):
         if us_url and tasks_url:
             try:
-                sprints_df, members_df, us_df, task_df = self.ts._import_data_by_urls(us_url, tasks_url)
-                self._process_taiga_data(sprints_df, members_df, us_df, task_df)
+                # Unchanged reports are only compared against, unless the stored data has to be rebuilt anyway
+                validators = self._get_taiga_report_validators() if self.taiga_data_available else dict()
+                sprints_df, members_df, us_df, task_df = self.ts._import_data_by_urls(us_url, tasks_url, validators)
+                if us_df is not None:
+                    self._process_taiga_data(sprints_df, members_df, us_df, task_df)
+                self._save_taiga_report_validators(self.ts.get_report_validators())
                 return 'Success', f'Successfully imported Taiga data by URLs'
             except Exception as e:
                 return 'Error', f'Failed to import Taiga data by URLs - {e}'
@@ -654,6 +847,7 @@ class DataController:
             try:   
                 sprints_df, members_df, us_df, task_df = self.ts._import_data_by_files(us_fp, tasks_fp)
                 self._process_taiga_data(sprints_df, members_df, us_df, task_df)
+                self._reset_taiga_report_validators()
                 return 'Success', f'Successfully imported Taiga data by File'
             except Exception as e:
                 return 'Error', f'Failed to import Taiga data by File - {e}'
@@ -665,26 +859,30 @@ class DataController:
         self.repos.loc[self.repos['repo_name'] == repo, 'last_commit_dt'] = date
         self._update_repos(self.repos, cols=['last_commit_dt'])
 
-    def update_commit_df(self, new_df : pd.DataFrame):
+    def _format_commit_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        if df is None:
+            return None
+        
+        self._inv_val_format(df)
+        df['id'] = df['id'].astype(pd.StringDtype())
+        df['task_num'] = df['task_num'].astype(pd.Int64Dtype())
+        df['utc_datetime'] = pd.to_datetime(df['utc_datetime'])
+
+        df = df.dropna(how='all')
+        df = df.drop_duplicates(subset=['id', 'repo_name'], keep='first').reset_index(drop=True)
+        df = df.sort_values(by='utc_datetime', ascending=True)
+        return df
+
+    def update_commit_df(self, new_df : pd.DataFrame, store=True):
         def to_table_format(df) -> pd.DataFrame:
             # df['utc_datetime'] = pd.to_datetime(df['utc_datetime']).dt.strftime('%Y-%m-%dT%H:%M:%SZ')
             return df
 
-        def format_df(df: pd.DataFrame) -> pd.DataFrame:
-            self._inv_val_format(df)
-            df['id'] = df['id'].astype(pd.StringDtype())
-            df['task_num'] = df['task_num'].astype(pd.Int64Dtype())
-            df['utc_datetime'] = pd.to_datetime(df['utc_datetime'])
-
-            df = df.dropna(how='all')
-            df = df.drop_duplicates(subset=['id', 'repo_name'], keep='first').reset_index(drop=True)
-            df = df.sort_values(by='utc_datetime', ascending=True)
-            return df
-
         if new_df is not None and len(new_df) > 0:
-            self.commits_df = self.update_df(self.commits_df, format_df(new_df))
-            self.db.df_to_table('commits', to_table_format(self.commits_df))
-            self.commits_df = format_df(self.db.table_to_df('commits'))
+            self.commits_df = self.update_df(self.commits_df, self._format_commit_df(new_df))
+            if store:
+                self.db.df_to_table('commits', to_table_format(self.commits_df))
+                self.commits_df = self._format_commit_df(self.db.table_to_df('commits'))
         self.commit_data_available = self.commits_df is not None and len(self.commits_df) > 0
 
     def _update_repos(self, new_df: pd.DataFrame, cols=['repo_name', 'owner_name']):
@@ -3,16 +3,34 @@ from github.AuthenticatedUser import AuthenticatedUser
 from github.NamedUser import NamedUser
 from github.Repository import Repository
 
+from models.database.HttpCache import HttpCache
+from models.RateLimiter import RateLimitBucket
+from models.HttpClient import HttpClient, iter_ordered_pages
+from models.CommitFormatter import format_commit_df
+
 import pandas as pd
 import numpy as np
 import requests
 import datetime
-import pytz
-import re
+import queue
+import threading
+import concurrent.futures as cf
+from urllib.parse import urlparse, parse_qs
+
+## Accounts store the site root of a GitHub Enterprise host, which serves its REST API from '<host>/api/v3'
+def github_api_url(host_url=None) -> str:
+    if not host_url:
+        return "https://api.github.com"
+    host_url = host_url.rstrip('/')
+    return host_url if host_url.endswith('/api/v3') else f'{host_url}/api/v3'
 
 class GitHubDataServicer:
-    def __init__(self, token=None):
-        self.base_url = "https://api.github.com"
+    def __init__(self, token=None, max_workers=8, host_url=None, http_client : HttpClient = None):
+        self.base_url = github_api_url(host_url)
+        self.http_client = http_client or HttpClient()
+        self.max_workers = max_workers
+        self.http_cache : HttpCache = None
+        self.rate_limiter : RateLimitBucket = None
         self.token = None
         self.gh_auth : Auth = None
         self.gh : Github = None
@@ -24,7 +42,8 @@ class GitHubDataServicer:
             
     def _init_obj(self):
         self.gh_auth = Auth.Token(self.token)
-        self.gh = Github(auth=self.gh_auth)
+        # PyGithub manages its own connection pool and cannot be handed a session, so it gets a pool of the same size
+        self.gh = Github(auth=self.gh_auth, base_url=self.base_url, pool_size=self.max_workers, timeout=self.http_client.timeout[1])
         self.user = self.gh.get_user()
 
     def set_token(self, token) -> bool:
@@ -44,6 +63,16 @@ class GitHubDataServicer:
     def ready_for_api_calls(self) -> bool:
         return self.auth_and_gh_set
     
+    def set_http_cache(self, http_cache : HttpCache):
+        self.http_cache = http_cache
+    
+    def set_rate_limiter(self, rate_limiter : RateLimitBucket):
+        self.rate_limiter = rate_limiter
+    
+    def set_max_workers(self, max_workers) -> int:
+        self.max_workers = max(1, int(max_workers))
+        return self.max_workers
+    
     def get_repos(self) -> pd.DataFrame:
         repo_list = []
         for repo in self.user.get_repos():
@@ -60,16 +89,23 @@ class GitHubDataServicer:
     def is_auth_user(self) -> bool:
         return isinstance(self.user, AuthenticatedUser) if self.user else False
 
-    def _get_repo_branches(self, repo : Repository) -> dict[str:str]:
+    def _get_repo_branches(self, header, repo_url) -> dict[str:str]:
         branch_dict = dict()
-        if repo:
-            for branch in repo.get_branches():
-                branch_name = branch.name
-                branch_sha = branch.commit.sha
+        next_url = f'{repo_url}/branches?per_page=100'
+        while next_url:
+            res = self._make_api_call(header, next_url)
+            # An empty listing would make the import save no tips and drop every stored one, so a failure stops the import
+            if res.status_code != 200:
+                raise Exception(f'Failed to list the branches of {repo_url} - {res.status_code} {res.reason}')
+            for branch in res.json():
+                branch_name = branch.get('name')
+                branch_sha = (branch.get('commit') or {}).get('sha')
 
                 if branch_name and branch_sha:
                     branch_dict[branch_name] = branch_sha
 
+            next_url = (res.links.get('next') or {}).get('url')
+
         return branch_dict
 
     def get_repo_by_name(self, repo_name):
@@ -90,25 +126,17 @@ class GitHubDataServicer:
                     contributor_list.append(contributor.login)    
         return contributor_list
     
-    def _get_commit_author(self, contributors, commit) -> str | None:
-        try:
-            author_name = commit["author"]["login"]
-        except:
-            author_name = None
-            
-        author_email = commit["commit"]["author"]["email"]
+    def _get_commit_authors(self, contributors, raw_df : pd.DataFrame) -> pd.Series:
+        logins = raw_df['author_login']
+        emails = raw_df['author_email']
+        suspected_names = emails.str.extract(r'^([^@]*)@', expand=False)
 
-        committer = None
-        if author_name and author_name != 'unknown':
-            if author_name in contributors:
-                committer = author_name
-        else:
-            if author_email and author_email != 'unknown':
-                suspected_name = author_email[0:author_email.index('@')]
+        # The GitHub login is used when there is one, otherwise the start of the author email is tried
+        has_login = logins.notna() & (logins != 'unknown')
+        from_email = ~has_login & emails.notna() & (emails != 'unknown') & suspected_names.isin(contributors)
 
-                if suspected_name in contributors:
-                    committer = suspected_name
-        return committer
+        committers = logins.where(has_login & logins.isin(contributors))
+        return committers.mask(from_email, suspected_names)
     
     def _inv_val_format(self, df: pd.DataFrame):
         df = df.replace(['', 'None', 'nan', 'NaN', np.nan, None], pd.NA)
@@ -124,87 +152,209 @@ class GitHubDataServicer:
         }
     
     def _make_api_call(self, header, url) -> requests.Response:
-        return requests.get(url, headers=header)
+        def send():
+            if self.http_cache is not None:
+                return self.http_cache.get(url, headers=header, client=self.http_client)
+            return self.http_client.get(url, headers=header)
+
+        if self.rate_limiter is not None:
+            return self.rate_limiter.run(send)
+        return send()
     
-    def import_commit_data(self, repo_name, repo_id=None, since=None):
-        auth_header = self._get_auth_header()
-        
-        {
-            'Accept': 'application/vnd.github+json',
-            'Authorization': f'Bearer {self.token}',
-            'X-GitHub-Api-Version': '2022-11-28'
-        }
+    def _get_last_page_num(self, res : requests.Response) -> int:
+        try:
+            last_url = res.links.get('last').get('url')
+            return int(parse_qs(urlparse(last_url).query)['page'][0])
+        except:
+            return 1
+    
+    def _page_url(self, url, page) -> str:
+        return url if page == 1 else f'{url}&page={page}'
+    
+    def _iter_pages(self, pool : cf.ThreadPoolExecutor, header, url, start_page=1, count_pages=None):
+        def fetch_page(page) -> requests.Response:
+            return self._make_api_call(header, self._page_url(url, page))
+
+        def get_last_page(res) -> int:
+            return max(count_pages(res) if count_pages else self._get_last_page_num(res), start_page)
+
+        return iter_ordered_pages(pool, fetch_page, start_page, get_last_page, self.max_workers)
+
+    def _get_base_branch(self, repo : Repository, branch_dict : dict[str:str]) -> str | None:
+        if repo and repo.default_branch in branch_dict:
+            return repo.default_branch
+        return next(iter(branch_dict), None)
+    
+    def _build_commit_df(self, repo_name, contributors, commits_json) -> pd.DataFrame:
+        raw_df = pd.DataFrame({
+            'id': [commit['sha'] for commit in commits_json],
+            'author_login': [(commit.get('author') or {}).get('login') for commit in commits_json],
+            'author_email': [commit['commit']['author']['email'] for commit in commits_json],
+            'commit_message': [commit['commit']['message'] for commit in commits_json],
+            'commit_date': [commit['commit']['committer']['date'] for commit in commits_json],
+            'commit_url': [commit['html_url'] for commit in commits_json]
+        }, dtype=object)
+        raw_df['committer'] = self._get_commit_authors(contributors, raw_df)
+
+        return format_commit_df(raw_df, repo_name, 'GitHub')
     
-        repo_obj = self.get_repo_by_name(repo_name)
+    def _process_commits(self, repo_name, contributors, commits_json) -> pd.DataFrame:
+        yield 'In Progress', f'Processing GitHub commit data ({len(commits_json)} commits)...'
+        return self._build_commit_df(repo_name, contributors, commits_json)
+    
+    def import_commit_data(self, repo_name, repo_id=None, since=None, stream=False, resume=None, branch_tips=None):
+        auth_header = self._get_auth_header()
+        complete_msg = f'Completed importing GitHub commit data from repository {repo_name}...'
+
+        repo_obj = self.get_repo_by_name(repo_name) if repo_id is None else None
+        base_url = repo_obj.url if repo_obj is not None else f'{self.base_url}/repositories/{repo_id}'
+        branch_dict = self._get_repo_branches(auth_header, base_url)
+
+        # Branches whose tip has not moved since the last import have nothing new to fetch
+        branch_tips = branch_tips or dict()
+        changed_branches = [branch for branch in branch_dict.keys() if branch_tips.get(branch) != branch_dict[branch]]
+        if len(changed_branches) == 0:
+            yield 'Complete', [complete_msg, None if stream else format_commit_df(None, repo_name, 'GitHub'), branch_dict]
+            return
+
+        repo_obj = repo_obj or self.gh.get_repo(int(repo_id))
         contributors = self._get_contributors(repo_obj)
-        branch_dict = self._get_repo_branches(repo_obj)
+        base_branch = self._get_base_branch(repo_obj, branch_dict)
 
-        base_url = repo_obj.url
         since_param = f'since={since}&' if since is not None else ''
+        resume = resume or dict()
 
-        commit_ids = []
+        # Previously synced tips are already stored, so history walks can stop when they reach one
+        seen_shas = set(branch_tips.values())
         commits_json = []
-        commits = []
-        
-        for branch in branch_dict.keys():
-            url = f'{base_url}/commits?{since_param}per_page=100&sha={branch_dict[branch]}'
-            yield 'In Progress', f'Importing GitHub commit data for branch {branch} from repository {repo_name}...'
+        # Bounded so fetching threads wait for the consumer instead of buffering the whole history
+        page_queue = queue.Queue(maxsize=self.max_workers * 2)
+        cancelled = threading.Event()
 
-            pagesRemaining = True
-            next_url = url
+        def put_page(branch, page, next_page, from_sha=None):
+            cursor = {'branch': branch, 'tip': branch_dict[branch], 'from': from_sha, 'next_page': next_page}
+            while not cancelled.is_set():
+                try:
+                    page_queue.put((branch, page, cursor), timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
 
-            while pagesRemaining:
-                res = self._make_api_call(header=auth_header, url=next_url)
-                for item in res.json():
-                    if item['sha'] not in commit_ids:
-                        commit_ids.append(item['sha'])
-                        commits_json.append(item)
+        def get_start_page(branch, from_sha=None) -> int | None:
+            # Returns None when the branch is unchanged or an earlier interrupted import already stored every page.
+            # Saved pages belong to one compare (or listing), so they only apply while both of its ends are the same
+            if branch not in changed_branches:
+                return None
+            
+            saved = resume.get(branch)
+            if saved is None or saved['tip'] != branch_dict[branch] or saved.get('from') != from_sha:
+                return 1
+            return int(saved['next_page']) if saved['next_page'] is not None else None
 
-                try:
-                    next_url = res.links.get('next').get('url')
-                except:
-                    pagesRemaining = False
-
-        commit_cnt = len(commits_json)
-        curr_num = 1
-
-        pattern = r'task[^a-zA-Z\d\s]?\d+'
-        for commit_entry in commits_json:
-            yield 'In Progress', f'Processing GitHub commit data (Commit {curr_num} of {commit_cnt})...'
-            curr_num += 1
-
-            id = commit_entry['sha']    # Used for identifying and filtering commits
-            url = commit_entry['html_url']
-            commit_obj = commit_entry["commit"]
-            committer = self._get_commit_author(contributors, commit_entry) # Author Details used to assign the commit
-            commit_msg = commit_obj['message']  # Commit date and title
-            match = re.search(pattern, commit_msg, re.IGNORECASE)
-            task_num = int(re.search(r'\d+', match.group()).group()) if match else None
+        def list_url(branch):
+            return f'{base_url}/commits?{since_param}per_page=100&sha={branch_dict[branch]}'
+
+        def check_page(branch, page, res):
+            # A failed page stops the branch, so no cursor is written past it and the import never reports Complete
+            if res.status_code != 200:
+                raise Exception(f'Failed to fetch page {page} of branch {branch} from repository {repo_name} - {res.status_code} {res.reason}')
+
+        def count_compare_pages(res) -> int:
+            ahead_by = res.json().get('ahead_by', 0) if res.status_code == 200 else 0
+            return max(self._get_last_page_num(res), -(-ahead_by // 100))
+
+        def fetch_compare(pool, branch, from_sha, start_page) -> bool:
+            # Compare only returns the commits reachable from the branch tip but not from from_sha
+            url = f'{base_url}/compare/{from_sha}...{branch_dict[branch]}?per_page=100'
+            for page, last_page, res in self._iter_pages(pool, auth_header, url, start_page, count_compare_pages):
+                if res.status_code != 200 and page == start_page:
+                    return False
+                check_page(branch, page, res)
+                put_page(branch, res.json().get('commits', []), str(page + 1) if page < last_page else None, from_sha)
+            return True
         
-            # Takes the commit timezone (UTC) and converts to AZ timezone
-            utc_dt = pd.to_datetime(commit_obj['committer']['date'], format='%Y-%m-%dT%H:%M:%SZ', utc=True)
-            az_dt = utc_dt.astimezone(pytz.timezone('US/Arizona'))
+        def fetch_base_branch(pool, branch):
+            prev_tip = branch_tips.get(branch)
+            start_page = get_start_page(branch, prev_tip)
+            if start_page is None:
+                return
             
-            commits.append({
-                "id": id,
-                "repo_name": repo_name,
-                "host_site": "GitHub",
-                "task_num": task_num,
-                "committer": committer,
-                "az_date": az_dt.strftime('%m/%d/%Y'),
-                "utc_datetime": utc_dt,
-                "commit_message": commit_msg,
-                "commit_url": url
-            })
+            if prev_tip is not None:
+                if fetch_compare(pool, branch, prev_tip, start_page):
+                    return
+                start_page = 1      # The saved page number belonged to the compare, not the branch listing
+            
+            for page, last_page, res in self._iter_pages(pool, auth_header, list_url(branch), start_page):
+                check_page(branch, page, res)
+                put_page(branch, res.json(), str(page + 1) if page < last_page else None)
+
+        def fetch_branch(pool, branch):
+            from_sha = branch_tips.get(branch, branch_dict[base_branch])
+            start_page = get_start_page(branch, from_sha)
+            if start_page is None:
+                return
+            if branch_dict[branch] in seen_shas:
+                put_page(branch, [], None, from_sha)
+                return      # Tip is already part of fetched or stored history, nothing unique to fetch
 
-        all_data = pd.json_normalize(commits)
+            if fetch_compare(pool, branch, from_sha, start_page):
+                return
             
-        # branch_commits = pd.json_normalize(commits)
-
-        # if branch_commits is not None and len(branch_commits) > 0:
-        #     if all_data is None or len(all_data) < 1:
-        #         all_data = branch_commits
-        #     else:
-        #         all_data = pd.concat([all_data, branch_commits]).drop_duplicates(subset='id', keep='first')
-                    
-        yield 'Complete', [f'Completed importing GitHub commit data from repository {repo_name}...', all_data]
\ No newline at end of file
+            # Compare fails for branches without a common ancestor (or a previous tip that no longer exists), so
+            # walk the branch history and stop at the first page that runs into history already seen
+            page = 1
+            while True:
+                res = pool.submit(self._make_api_call, auth_header, self._page_url(list_url(branch), page)).result()
+                check_page(branch, page, res)
+                items = res.json()
+                reached_end = res.links.get('next') is None or any(item['sha'] in seen_shas for item in items)
+                put_page(branch, items, None if reached_end else str(page + 1))
+                if reached_end:
+                    break
+                page += 1
+
+        def collect(branch_futures):
+            pages_fetched = 0
+            while True:
+                try:
+                    branch, page, cursor = page_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if all(future.done() for future in branch_futures) and page_queue.empty():
+                        break
+                    continue
+
+                pages_fetched += 1
+                yield 'In Progress', f'Importing GitHub commit data for branch {branch} from repository {repo_name} ({pages_fetched} pages fetched)...'
+
+                new_commits = []
+                for item in page:
+                    if item['sha'] not in seen_shas:
+                        seen_shas.add(item['sha'])
+                        new_commits.append(item)
+
+                if stream:
+                    yield 'Page', [self._build_commit_df(repo_name, contributors, new_commits), cursor]
+                else:
+                    commits_json.extend(new_commits)
+
+            for future in branch_futures:
+                future.result()
+
+        # The base branch is fetched first so that every other branch only needs its own unique commits.
+        # All HTTP requests go through page_pool, which bounds the number of requests in flight to max_workers
+        with cf.ThreadPoolExecutor(max_workers=self.max_workers) as page_pool, \
+                cf.ThreadPoolExecutor(max_workers=self.max_workers) as branch_pool:
+            try:
+                if base_branch is not None:
+                    yield from collect([branch_pool.submit(fetch_base_branch, page_pool, base_branch)])
+
+                other_branches = [branch for branch in branch_dict.keys() if branch != base_branch]
+                yield from collect([branch_pool.submit(fetch_branch, page_pool, branch) for branch in other_branches])
+            finally:
+                cancelled.set()
+
+        if stream:
+            yield 'Complete', [complete_msg, None, branch_dict]
+        else:
+            all_data = yield from self._process_commits(repo_name, contributors, commits_json)
+            yield 'Complete', [complete_msg, all_data, branch_dict]
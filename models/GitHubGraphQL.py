@@ -0,0 +1,195 @@
+from models.GitHub import GitHubDataServicer
+from models.HttpClient import HttpClient
+from github.Repository import Repository
+
+refs_query = """
+query($owner: String!, $name: String!, $cursor: String) {
+    repository(owner: $owner, name: $name) {
+        defaultBranchRef { name }
+        refs(refPrefix: "refs/heads/", first: 100, after: $cursor) {
+            pageInfo { hasNextPage endCursor }
+            nodes { name target { oid } }
+        }
+    }
+}"""
+
+users_query = """
+query($owner: String!, $name: String!, $cursor: String) {
+    repository(owner: $owner, name: $name) {
+        mentionableUsers(first: 100, after: $cursor) {
+            pageInfo { hasNextPage endCursor }
+            nodes { login }
+        }
+    }
+}"""
+
+history_fields = """
+    history(first: 100, after: %s, since: $since) {
+        pageInfo { hasNextPage endCursor }
+        nodes {
+            oid
+            message
+            committedDate
+            url
+            author { email user { login } }
+        }
+    }"""
+
+class GitHubGraphQLDataServicer(GitHubDataServicer):
+    def __init__(self, token=None, max_workers=8, host_url=None, http_client : HttpClient = None, batch_size=20):
+        super().__init__(token, max_workers, host_url, http_client)
+        # GitHub Enterprise serves GraphQL from '<host>/api/graphql' rather than under the REST '/api/v3' path
+        self.graphql_url = f"{self.base_url.removesuffix('/v3')}/graphql"
+        self.batch_size = batch_size
+
+    def _make_graphql_call(self, query, variables=None) -> dict:
+        def send():
+            return self.http_client.post(self.graphql_url, headers=self._get_auth_header(), json={'query': query, 'variables': variables or {}})
+
+        res = self.rate_limiter.run(send) if self.rate_limiter is not None else send()
+        # Gateway errors come back as HTML pages, so the status is checked before the body is parsed
+        if res.status_code != 200:
+            raise Exception(f"GitHub GraphQL request failed ({res.status_code}) - {res.reason}")
+        payload = res.json()
+        if payload.get('errors'):
+            raise Exception(f"GitHub GraphQL request failed ({res.status_code}) - {payload['errors'][0].get('message')}")
+        return payload['data']
+
+    def _get_contributors(self, repo : Repository) -> list[str]:
+        # Users who can be mentioned in the repository, i.e. its collaborators and the people who took part in it
+        contributors = []
+        if repo:
+            owner, name = repo.full_name.split('/', 1)
+            cursor = None
+            while True:
+                users = self._make_graphql_call(users_query, {'owner': owner, 'name': name, 'cursor': cursor})['repository']['mentionableUsers']
+                contributors.extend(user['login'] for user in users['nodes'] if user)
+                if not users['pageInfo']['hasNextPage']:
+                    break
+                cursor = users['pageInfo']['endCursor']
+        return contributors
+
+    def _get_repo_refs(self, owner, name) -> tuple[str | None, dict[str:str]]:
+        branch_dict = dict()
+        default_branch = None
+        cursor = None
+
+        while True:
+            repo = self._make_graphql_call(refs_query, {'owner': owner, 'name': name, 'cursor': cursor})['repository']
+            if repo['defaultBranchRef']:
+                default_branch = repo['defaultBranchRef']['name']
+
+            for ref in repo['refs']['nodes']:
+                if ref['name'] and ref['target']:
+                    branch_dict[ref['name']] = ref['target']['oid']
+
+            page_info = repo['refs']['pageInfo']
+            if not page_info['hasNextPage']:
+                break
+            cursor = page_info['endCursor']
+
+        return default_branch, branch_dict
+
+    def _get_history_pages(self, owner, name, cursors : dict[str:str | None], since=None) -> dict[str:dict]:
+        # Each branch gets its own aliased 'object' lookup so one query pages through many branches at once
+        aliases = []
+        for idx, (oid, cursor) in enumerate(cursors.items()):
+            after = f'"{cursor}"' if cursor else 'null'
+            aliases.append(f'b{idx}: object(oid: "{oid}") {{ ... on Commit {{{history_fields % after}\n}} }}')
+
+        query = 'query($owner: String!, $name: String!, $since: GitTimestamp) {\n' \
+            + f'repository(owner: $owner, name: $name) {{\n{chr(10).join(aliases)}\n}}\n}}'
+        repo = self._make_graphql_call(query, {'owner': owner, 'name': name, 'since': since})['repository']
+
+        return {oid: repo[f'b{idx}']['history'] for idx, oid in enumerate(cursors.keys()) if repo.get(f'b{idx}')}
+
+    def _to_rest_commit(self, node) -> dict:
+        # Matches the shape of the REST commit listing so the shared processing can be reused
+        author = node.get('author') or {}
+        user = author.get('user') or {}
+        return {
+            'sha': node['oid'],
+            'html_url': node['url'],
+            'author': {'login': user.get('login')} if user else None,
+            'commit': {
+                'message': node['message'],
+                'author': {'email': author.get('email')},
+                'committer': {'date': node['committedDate']}
+            }
+        }
+
+    def import_commit_data(self, repo_name, repo_id=None, since=None, stream=False, resume=None, branch_tips=None):
+        repo_obj = self.gh.get_repo(int(repo_id)) if repo_id is not None else self.get_repo_by_name(repo_name)
+        owner, name = repo_obj.full_name.split('/', 1)
+
+        yield 'In Progress', f'Importing GitHub branch list for repository {repo_name}...'
+        default_branch, branch_dict = self._get_repo_refs(owner, name)
+        resume = resume or dict()
+
+        # Previously synced tips are already stored, so unchanged branches are skipped and changed ones stop
+        # paging once their history reaches the old tip
+        branch_tips = branch_tips or dict()
+        seen_shas = set(branch_tips.values())
+        commits_json = []
+        contributors = self._get_contributors(repo_obj)
+
+        def fetch_histories(branches):
+            # Tips keyed by oid so branches pointing at the same commit are only walked once
+            cursors = dict()
+            oid_branches = dict()
+            for branch in branches:
+                oid = branch_dict[branch]
+                saved = resume.get(branch)
+                if oid in seen_shas or oid in cursors:
+                    continue
+                if saved is not None and saved['tip'] == oid:
+                    if saved['next_page'] is None:
+                        continue    # Already fully stored by an earlier interrupted import
+                    cursors[oid] = saved['next_page']
+                else:
+                    cursors[oid] = None
+                oid_branches[oid] = branch
+
+            queries_made = 0
+            while cursors:
+                batch = dict(list(cursors.items())[:self.batch_size])
+                histories = self._get_history_pages(owner, name, batch, since)
+                queries_made += 1
+                yield 'In Progress', f'Importing GitHub commit data from repository {repo_name} ({queries_made} queries made)...'
+
+                for oid in batch.keys():
+                    history = histories.get(oid)
+                    cursors.pop(oid)
+                    if history is None:
+                        continue
+
+                    reached_seen = False
+                    new_commits = []
+                    for node in history['nodes']:
+                        if node['oid'] in seen_shas:
+                            reached_seen = True
+                        else:
+                            seen_shas.add(node['oid'])
+                            new_commits.append(self._to_rest_commit(node))
+
+                    # A branch stops paging once it runs into history already fetched from another branch
+                    next_cursor = None
+                    if history['pageInfo']['hasNextPage'] and not reached_seen:
+                        next_cursor = cursors[oid] = history['pageInfo']['endCursor']
+
+                    if stream:
+                        cursor = {'branch': oid_branches[oid], 'tip': oid, 'next_page': next_cursor}
+                        yield 'Page', [self._build_commit_df(repo_name, contributors, new_commits), cursor]
+                    else:
+                        commits_json.extend(new_commits)
+
+        if default_branch in branch_dict:
+            yield from fetch_histories([default_branch])
+        yield from fetch_histories([branch for branch in branch_dict.keys() if branch != default_branch])
+
+        if stream:
+            yield 'Complete', [f'Completed importing GitHub commit data from repository {repo_name}...', None, branch_dict]
+            return
+
+        all_data = yield from self._process_commits(repo_name, contributors, commits_json)
+        yield 'Complete', [f'Completed importing GitHub commit data from repository {repo_name}...', all_data, branch_dict]
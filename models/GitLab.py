@@ -1,15 +1,20 @@
+from models.database.HttpCache import HttpCache
+from models.RateLimiter import RateLimitBucket
+from models.HttpClient import HttpClient, iter_ordered_pages
+from models.CommitFormatter import format_commit_df
+
 import pandas as pd
 import numpy as np
 import requests
 import datetime
-import pytz
-import re
 import gitlab
 from gitlab import Gitlab
 import json
+import hashlib
+import concurrent.futures as cf
 
 class GitLabDataServicer:
-    base_url = "https://gitlab/api/v4/projects"
+    base_url = "https://gitlab.com/api/v4/projects"
 
     project_id = None
     token = None
@@ -17,17 +22,23 @@ class GitLabDataServicer:
     auth_verified = False
     repo_verified = False
     
-    def __init__(self, token=None):
-        self.base_url = "https://gitlab/api/v4/projects"
+    def __init__(self, token=None, max_workers=8, host_url=None, http_client : HttpClient = None):
+        self.host_url = host_url.rstrip('/') if host_url else "https://gitlab.com"
+        self.base_url = f'{self.host_url}/api/v4/projects'
+        self.http_client = http_client or HttpClient()
+        self.max_workers = max_workers
         self.token = None
         self.gl : Gitlab = None
+        self.http_cache : HttpCache = None
+        self.rate_limiter : RateLimitBucket = None
         self.auth_and_gl_set = False
+        self.usernames : dict[int:str] = dict()
 
         if token: 
             self.set_token(token)
             
     def _init_obj(self):
-        self.gl = Gitlab(private_token=self.token)
+        self.gl = Gitlab(url=self.host_url, private_token=self.token, session=self.http_client.get_session(self.host_url), timeout=self.http_client.timeout)
 
     def set_token(self, token) -> bool:
         self.token = token
@@ -46,30 +57,52 @@ class GitLabDataServicer:
     def ready_for_api_calls(self) -> bool:
         return self.auth_and_gl_set
     
+    def set_http_cache(self, http_cache : HttpCache):
+        self.http_cache = http_cache
+    
+    def set_rate_limiter(self, rate_limiter : RateLimitBucket):
+        self.rate_limiter = rate_limiter
+    
+    def _get_username(self, user_id) -> str | None:
+        if user_id not in self.usernames:
+            try:
+                self.usernames[user_id] = self.gl.users.get(user_id).attributes['username']
+            except:
+                return None
+        return self.usernames[user_id]
+
     def get_repos(self) -> pd.DataFrame:
-        repo_list = []
-        for item in self.gl.projects.list(membership=True):
-            id = item.id
-            name = item.name
-            owner_id = self.gl.projects.get(id).creator_id
-            owner = self.gl.users.get(owner_id).attributes['username']
+        projects = [item.attributes for item in self.gl.projects.list(membership=True, get_all=True)]
+
+        # User namespace projects carry their owner in the listing, so only group projects need a creator lookup,
+        # and each distinct creator is only looked up once
+        for project in projects:
+            if project.get('owner'):
+                self.usernames[project['owner']['id']] = project['owner']['username']
 
+        creator_ids = {project.get('creator_id') for project in projects if not project.get('owner')} - {None}
+        with cf.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(self._get_username, creator_ids - set(self.usernames.keys())))
+
+        repo_list = []
+        for project in projects:
+            owner = project['owner']['username'] if project.get('owner') else self.usernames.get(project.get('creator_id'))
             repo_list.append({ 
-                'id': id,
-                'repo_name': name, 
-                'owner_name': owner,
+                'id': project['id'],
+                'repo_name': project['name'], 
+                'owner_name': owner or project['namespace']['path'],
                 'is_linked': False,
                 'last_commit_dt': None
             })
         repos = pd.json_normalize(repo_list)
         return repos
 
-    def _get_repo_branches(self, repo) -> list[str]:
-        branch_list = []
+    def _get_repo_branches(self, repo) -> dict[str:str]:
+        branch_dict = dict()
         if repo:
             for branch in repo.branches.list(get_all=True):
-                branch_list.append(branch.name)
-        return branch_list
+                branch_dict[branch.name] = branch.commit['id']
+        return branch_dict
     
     def get_contributors(self, repo_name) -> list[str]:
         repo = self.get_repo(repo_name)
@@ -100,69 +133,137 @@ class GitLabDataServicer:
         return self.gl.projects.get(repo_name)
     
     def _make_api_call(self, header, url) -> requests.Response:
-        return requests.get(url, headers=header)
+        def send():
+            if self.http_cache is not None:
+                return self.http_cache.get(url, headers=header, client=self.http_client)
+            return self.http_client.get(url, headers=header)
+
+        if self.rate_limiter is not None:
+            return self.rate_limiter.run(send)
+        return send()
+    
+    def _get_total_pages(self, res : requests.Response) -> int | None:
+        try:
+            return int(res.headers.get('X-Total-Pages'))
+        except (TypeError, ValueError):
+            return None
+    
+    def _iter_pages(self, pool : cf.ThreadPoolExecutor, header, url, start_page=1):
+        def fetch_page(page) -> requests.Response:
+            return self._make_api_call(header, f'{url}&page={page}')
+
+        for page, total_pages, res in iter_ordered_pages(pool, fetch_page, start_page, self._get_total_pages, self.max_workers):
+            if total_pages is not None:
+                yield page, page < total_pages, res
+                continue
+
+            # GitLab leaves out the totals for very large result sets, in which case the pages are walked one by one
+            # (keyset pagination is not available for the commits endpoint)
+            while True:
+                has_next = res.links.get('next') is not None
+                yield page, has_next, res
+                if not has_next:
+                    return
+                page += 1
+                res = fetch_page(page)
+    
+    def _build_commit_df(self, repo_name, commits_json) -> pd.DataFrame:
+        raw_df = pd.DataFrame({
+            'id': [commit['id'] for commit in commits_json],
+            'committer': [commit['committer_name'] for commit in commits_json],
+            'commit_message': [commit['title'] for commit in commits_json],
+            'commit_date': [commit['created_at'] for commit in commits_json],
+            'commit_url': [commit['web_url'] for commit in commits_json]
+        }, dtype=object)
+        return format_commit_df(raw_df, repo_name, 'GitLab')
     
-    def import_commit_data(self, repo_name, repo_id, since=None):
+    def import_commit_data(self, repo_name, repo_id, since=None, stream=False, resume=None, branch_tips=None):
         auth_header = {
             'PRIVATE-TOKEN': f'{self.token}'
         }
+        complete_msg = f'Completed importing GitLab commit data from repository {repo_name}...'
     
-        repo_obj = self.get_repo(repo_id)
+        repo_obj = self.gl.projects.get(repo_id, lazy=True)
+        project_url = f'{self.base_url}/{repo_obj.get_id()}'
+        branch_dict = self._get_repo_branches(repo_obj)
+        resume = resume or dict()
 
-        since_param = f'&since={since}' if since is not None else ''
-        url = f'https://gitlab.com/api/v4/projects/{repo_obj.get_id()}/repository/commits?{since_param}all=True&per_page=100'
-        commit_ids = []
+        # Branches whose tip has not moved since the last import have nothing new to fetch
+        branch_tips = branch_tips or dict()
+        changed_branches = [branch for branch in branch_dict.keys() if branch_tips.get(branch) != branch_dict[branch]]
+        if len(changed_branches) == 0:
+            yield 'Complete', [complete_msg, None if stream else self._build_commit_df(repo_name, []), branch_dict]
+            return
 
-        pagesRemaining = True
-        commits = []
+        commit_ids = set()
         commits_json = []
-        next_url = url
 
-        yield 'In Progress', f'Importing GitLab commit data from repository {repo_name}...'
+        def add_new_commits(items) -> list:
+            new_commits = []
+            for item in items:
+                if item['id'] not in commit_ids:
+                    commit_ids.add(item['id'])
+                    new_commits.append(item)
+            
+            if not stream:
+                commits_json.extend(new_commits)
+            return new_commits
 
-        while pagesRemaining:
-            res = self._make_api_call(header=auth_header, url=next_url)
-            pattern = r'task[^a-zA-Z\d\s]?\d+'
+        # Changed branches are compared against their previous tip, and new branches against the default branch,
+        # which only works once the default branch itself has been synced before
+        list_all = True
+        if len(branch_tips) > 0:
+            default_branch = self.get_repo_by_id(repo_id).default_branch
+            list_all = default_branch not in branch_tips or default_branch not in branch_dict
 
-            for item in res.json():
-                if item['id'] not in commit_ids:
-                    commit_ids.append(item['id'])
-                    commits_json.append(item)
+            for branch in changed_branches if not list_all else []:
+                from_sha = branch_tips.get(branch, branch_dict[default_branch])
+                saved = resume.get(branch)
+                if saved is not None and saved['tip'] == branch_dict[branch] and saved.get('from') == from_sha and saved['next_page'] is None:
+                    continue
 
-            try:
-                next_url = res.links.get('next').get('url')
-            except:
-                pagesRemaining = False
-
-        commit_cnt = len(commits_json)
-        curr_num = 1
-        
-        for commit in commits_json:
-            yield 'In Progress', f'Processing GitLab commit data (Commit {curr_num} of {commit_cnt})...'
-            curr_num += 1
-
-            id = commit['id']
-            url = commit['web_url']
-            committer = commit['committer_name']
-            commit_msg = commit['title'] 
-            match = re.search(pattern, commit_msg, re.IGNORECASE)
-            task_num = int(re.search(r'\d+', match.group()).group()) if match else None
-        
-            # Takes the commit timezone (UTC) and converts to AZ timezone
-            utc_dt = pd.to_datetime(commit['created_at'], format='ISO8601', utc=True)
-            az_dt = utc_dt.astimezone(pytz.timezone('US/Arizona'))
-            
-            commits.append({
-                "id": id,
-                "repo_name": repo_name,
-                "host_site": "GitLab",
-                "task_num": task_num,
-                "committer": committer,
-                "az_date": az_dt.strftime('%m/%d/%Y'),
-                "utc_datetime": utc_dt,
-                "commit_message": commit_msg,
-                "commit_url": url
-            })
-            
-        all_data = pd.json_normalize(commits)                
-        yield 'Complete', [f'Completed importing GitLab commit data from repository {repo_name}...', all_data]
\ No newline at end of file
+                yield 'In Progress', f'Importing GitLab commit data for branch {branch} from repository {repo_name}...'
+                res = self._make_api_call(header=auth_header, url=f'{project_url}/repository/compare?from={from_sha}&to={branch_dict[branch]}')
+                if res.status_code != 200:
+                    list_all = True     # The previous tip no longer exists (e.g. after a force push)
+                    break
+
+                new_commits = add_new_commits(res.json().get('commits', []))
+                if stream:
+                    yield 'Page', [self._build_commit_df(repo_name, new_commits), {'branch': branch, 'tip': branch_dict[branch], 'from': from_sha, 'next_page': None}]
+
+        if list_all:
+            since_param = f'&since={since}' if since is not None else ''
+            url = f'{project_url}/repository/commits?{since_param}all=True&per_page=100'
+
+            # The whole repository is listed as one stream, so an interrupted import resumes from the saved page. The
+            # listing is newest first and not anchored to any commit, so the saved page is only valid while the branch
+            # tips are the ones it was listed from; once a branch moves the listing starts over from page 1
+            list_key = hashlib.sha1(' '.join([since or ''] + [f'{branch}:{branch_dict[branch]}' for branch in sorted(branch_dict)]).encode('utf-8')).hexdigest()
+            saved = resume.get('*')
+            if saved is not None and saved['tip'] != list_key:
+                saved = None
+            if saved is None or saved['next_page'] is not None:
+                start_page = int(saved['next_page']) if saved is not None and saved['next_page'].isdigit() else 1
+
+                yield 'In Progress', f'Importing GitLab commit data from repository {repo_name}...'
+
+                with cf.ThreadPoolExecutor(max_workers=self.max_workers) as page_pool:
+                    for page, has_next, res in self._iter_pages(page_pool, auth_header, url, start_page):
+                        # A failed page stops the import, so no cursor is written past it and the import never reports Complete
+                        if res.status_code != 200:
+                            raise Exception(f'Failed to fetch page {page} of commits from repository {repo_name} - {res.status_code} {res.reason}')
+                        new_commits = add_new_commits(res.json())
+                        yield 'In Progress', f'Importing GitLab commit data from repository {repo_name} ({page} pages fetched)...'
+
+                        if stream:
+                            next_page = str(page + 1) if has_next else None
+                            yield 'Page', [self._build_commit_df(repo_name, new_commits), {'branch': '*', 'tip': list_key, 'next_page': next_page}]
+
+        if stream:
+            yield 'Complete', [complete_msg, None, branch_dict]
+            return
+
+        yield 'In Progress', f'Processing GitLab commit data ({len(commits_json)} commits)...'
+        all_data = self._build_commit_df(repo_name, commits_json)
+        yield 'Complete', [complete_msg, all_data, branch_dict]
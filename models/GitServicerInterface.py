@@ -5,26 +5,48 @@ import pandas as pd
 import numpy as np
 
 from models.GitHub import GitHubDataServicer
+from models.GitHubGraphQL import GitHubGraphQLDataServicer
 from models.GitLab import GitLabDataServicer
+from models.LocalGit import LocalGitDataServicer
+from models.database.HttpCache import HttpCache
+from models.RateLimiter import RateLimitScheduler
+from models.HttpClient import HttpClient
 
 class GitServicer:
-    def __init__(self):
-        self.servicers : dict[str:GitHubDataServicer|GitLabDataServicer] = dict()
+    def __init__(self, max_workers=8, github_api='REST', http_cache : HttpCache = None, http_client : HttpClient = None):
+        self.servicers : dict[str:GitHubDataServicer|GitLabDataServicer|LocalGitDataServicer] = dict()
+        self.max_workers = max_workers
+        self.github_api = github_api
+        self.http_cache = http_cache
+        self.scheduler = RateLimitScheduler()
+        # Accounts on the same host share the client's keep-alive session for that host
+        self.http_client = http_client or HttpClient(pool_size=max_workers)
 
-    def init_git_servicer(self, host, nickname, token) -> bool:
+    def init_git_servicer(self, host, nickname, token, host_url=None, api_type=None) -> bool:
         match host:
             case 'GitHub':
-                self.servicers[nickname] = GitHubDataServicer(token)
-                return self.ready_for_api_calls(nickname)
+                # Each GitHub account can choose its API, otherwise the servicer-wide default is used
+                if (api_type or self.github_api) == 'GraphQL':
+                    servicer = GitHubGraphQLDataServicer(token, self.max_workers, host_url, self.http_client)
+                else:
+                    servicer = GitHubDataServicer(token, self.max_workers, host_url, self.http_client)
             case 'GitLab':
-                self.servicers[nickname] = GitLabDataServicer(token)
-                return self.ready_for_api_calls(nickname)
+                servicer = GitLabDataServicer(token, self.max_workers, host_url, self.http_client)
+            case 'LocalGit':
+                servicer = LocalGitDataServicer(token)
             case _:
                 return False
+            
+        # Requests are paced per account, since each account token has its own rate limit budget
+        servicer.set_http_cache(self.http_cache)
+        servicer.set_rate_limiter(self.scheduler.get_bucket(nickname))
+        self.servicers[nickname] = servicer
+        return self.ready_for_api_calls(nickname)
     
     def remove_servicer(self, nickname) -> bool:
         if nickname in self.servicers.keys():
             self.servicers.pop(nickname)
+        self.scheduler.remove_bucket(nickname)
         return True
     
     def set_token(self, nickname, token) -> bool:
@@ -39,6 +61,9 @@ class GitServicer:
         servicer : GitHubDataServicer | GitLabDataServicer = self.servicers[nickname]
         return servicer.ready_for_api_calls()
     
+    def get_throttled_time(self, nickname) -> float:
+        return self.scheduler.get_throttled_time(nickname)
+    
     def get_repos(self, nickname) -> pd.DataFrame:
         servicer : GitHubDataServicer | GitLabDataServicer = self.servicers[nickname]
         repos = servicer.get_repos()
@@ -49,7 +74,7 @@ class GitServicer:
         servicer : GitHubDataServicer | GitLabDataServicer = self.servicers[nickname]
         return servicer._get_contributors(repo)
     
-    def import_commit_data(self, nickname, repo, repo_id=None, since=None):
+    def import_commit_data(self, nickname, repo, repo_id=None, since=None, stream=False, resume=None, branch_tips=None):
         servicer : GitHubDataServicer | GitLabDataServicer = self.servicers[nickname]
-        for res, data in servicer.import_commit_data(repo, repo_id, since):
+        for res, data in servicer.import_commit_data(repo, repo_id, since, stream, resume, branch_tips):
             yield res, data
@@ -0,0 +1,101 @@
+import threading
+import time
+import requests
+import concurrent.futures as cf
+from collections import deque
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+## Yields (page, last_page, response) for first_page through the last page reported by count_pages(first response).
+## Once the page count is known the following pages are requested ahead of time on pool, at most window pages ahead
+## of the consumer, and handed back in page order. When count_pages returns None only the first page is yielded
+def iter_ordered_pages(pool : cf.ThreadPoolExecutor, fetch_page, first_page, count_pages, window):
+    first_res = pool.submit(fetch_page, first_page).result()
+    last_page = count_pages(first_res)
+    yield first_page, last_page, first_res
+    if last_page is None:
+        return
+
+    pending = deque()
+    next_page = first_page + 1
+    while next_page <= last_page or pending:
+        while next_page <= last_page and len(pending) < window:
+            pending.append((next_page, pool.submit(fetch_page, next_page)))
+            next_page += 1
+
+        page, future = pending.popleft()
+        yield page, last_page, future.result()
+
+class HttpClient:
+    def __init__(self, pool_size=10, timeout=(10, 60)):
+        self.pool_size = pool_size
+        self.timeout = timeout      # (connect, read) seconds, so a hung socket can never block forever
+        self.sessions : dict[str:requests.Session] = dict()
+        self.metrics : dict[str:dict] = dict()
+        self.lock = threading.Lock()
+
+    def _host_key(self, url) -> str:
+        parsed = urlparse(url)
+        return f'{parsed.scheme}://{parsed.netloc}'
+
+    def get_session(self, url) -> requests.Session:
+        # One keep-alive session per host, so TLS connections are reused by every caller talking to that host
+        key = self._host_key(url)
+        with self.lock:
+            if key not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.sessions[key] = session
+            return self.sessions[key]
+
+    def _record(self, url, elapsed, failed):
+        key = self._host_key(url)
+        with self.lock:
+            host = self.metrics.setdefault(key, {'requests': 0, 'errors': 0, 'total_time': 0.0, 'max_time': 0.0})
+            host['requests'] += 1
+            host['errors'] += int(failed)
+            host['total_time'] += elapsed
+            host['max_time'] = max(host['max_time'], elapsed)
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        failed = True
+        try:
+            res = self.get_session(url).request(method, url, **kwargs)
+            failed = res.status_code >= 400
+            return res
+        finally:
+            self._record(url, time.perf_counter() - start, failed)
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def set_pool_size(self, pool_size):
+        # Only sessions created after the change use the new size
+        self.pool_size = pool_size
+
+    def set_timeout(self, timeout):
+        self.timeout = timeout
+
+    def get_metrics(self) -> dict[str:dict]:
+        with self.lock:
+            return {
+                host: {
+                    'requests': data['requests'],
+                    'errors': data['errors'],
+                    'avg_ms': round(1000 * data['total_time'] / data['requests'], 1),
+                    'max_ms': round(1000 * data['max_time'], 1)
+                } for host, data in self.metrics.items()
+            }
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
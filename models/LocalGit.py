@@ -0,0 +1,206 @@
+from models.database.HttpCache import HttpCache
+from models.RateLimiter import RateLimitBucket
+from models.CommitFormatter import format_commit_df
+
+import pandas as pd
+import subprocess
+import tempfile
+import hashlib
+import zlib
+import os
+import re
+from pathlib import Path
+
+## Fields are separated by the unit separator and commits by the record separator, which do not appear in commit data
+field_sep = '\x1f'
+record_sep = '\x1e'
+log_format = f'%H{field_sep}%an{field_sep}%cI{field_sep}%B{record_sep}'
+
+## Matches remote urls such as 'git@github.com:owner/repo.git' or 'https://gitlab.com/owner/repo'
+remote_pattern = r'^(?:[a-z+]+://)?(?:[^@/]+@)?([^:/]+)[:/](.+?)(?:\.git)?/?$'
+
+class LocalGitDataServicer:
+    def __init__(self, token=None, page_size=5000):
+        self.token = None
+        self.page_size = page_size
+        self.http_cache : HttpCache = None
+        self.rate_limiter : RateLimitBucket = None
+        self.repo_paths : dict[str:str] = dict()
+        self.auth_and_git_set = False
+
+        if token:
+            self.set_token(token)
+
+    def _run_git(self, path, args) -> str:
+        res = subprocess.run(['git', '-C', path] + args, capture_output=True, text=True, encoding='utf-8', errors='replace')
+        if res.returncode != 0:
+            raise Exception(f"git {args[0]} failed for {path} - {res.stderr.strip()}")
+        return res.stdout
+
+    def _is_git_repo(self, path) -> bool:
+        try:
+            return self._run_git(path, ['rev-parse', '--git-dir']).strip() in ['.', '.git']
+        except:
+            return False
+
+    def set_token(self, token) -> bool:
+        # The 'token' of a local account is the directory holding the clones (or a single clone)
+        self.token = token
+        self.auth_and_git_set = bool(self.token) and os.path.isdir(self.token)
+        return self.auth_and_git_set
+
+    def get_token(self) -> str:
+        return self.token
+
+    def ready_for_api_calls(self) -> bool:
+        return self.auth_and_git_set
+
+    def set_http_cache(self, http_cache : HttpCache):
+        self.http_cache = http_cache
+
+    def set_rate_limiter(self, rate_limiter : RateLimitBucket):
+        self.rate_limiter = rate_limiter
+
+    def _find_repos(self) -> dict[str:str]:
+        root = os.path.abspath(self.token)
+        if self._is_git_repo(root):
+            paths = [root]
+        else:
+            paths = [entry.path for entry in os.scandir(root) if entry.is_dir() and self._is_git_repo(entry.path)]
+
+        self.repo_paths = {Path(path).name.removesuffix('.git'): path for path in sorted(paths)}
+        return self.repo_paths
+
+    def _get_repo_path(self, repo_name) -> str:
+        if repo_name not in self.repo_paths:
+            self._find_repos()
+        return self.repo_paths[repo_name]
+
+    def _get_remote(self, path) -> tuple[str | None, str | None]:
+        # Returns the host and 'owner/repo' path of the origin remote, when the clone has one
+        try:
+            remote_url = self._run_git(path, ['config', '--get', 'remote.origin.url']).strip()
+        except:
+            return None, None
+
+        match = re.match(remote_pattern, remote_url)
+        return (match.group(1), match.group(2)) if match else (None, None)
+
+    def get_repos(self) -> pd.DataFrame:
+        repo_list = []
+        for name, path in self._find_repos().items():
+            _, remote_path = self._get_remote(path)
+            owner = remote_path.split('/')[0] if remote_path else Path(path).parent.name
+
+            repo_list.append({
+                'id': zlib.crc32(path.encode('utf-8')),
+                'repo_name': name,
+                'owner_name': owner,
+                'is_linked': False,
+                'last_commit_dt': None
+            })
+        repos = pd.json_normalize(repo_list)
+        return repos
+
+    def _get_repo_branches(self, path) -> dict[str:str]:
+        # Mirrors keep branches under refs/heads while working clones keep them under refs/remotes
+        branch_dict = dict()
+        refs = self._run_git(path, ['for-each-ref', '--format=%(refname:short) %(objectname)', 'refs/heads', 'refs/remotes'])
+        for line in refs.splitlines():
+            branch, sha = line.rsplit(' ', 1)
+            if not branch.endswith('/HEAD'):
+                branch_dict[branch] = sha
+        return branch_dict
+
+    def get_contributors(self, repo_name) -> list[str]:
+        return self._get_contributors(repo_name)
+
+    def _get_contributors(self, repo) -> list[str]:
+        contributors = []
+        if repo is not None:
+            shortlog = self._run_git(self._get_repo_path(repo), ['shortlog', '-s', '-n', '--all'])
+            contributors = [line.split('\t', 1)[1] for line in shortlog.splitlines() if '\t' in line]
+        return contributors
+
+    def _build_commit_df(self, repo_name, path, records) -> pd.DataFrame:
+        host, remote_path = self._get_remote(path)
+        commit_base = f"https://{host}/{remote_path}/{'-/' if 'gitlab' in host else ''}commit/" if host else f'{Path(path).as_uri()}#'
+
+        raw_df = pd.DataFrame(records, columns=['id', 'committer', 'commit_date', 'commit_message'], dtype=object)
+        raw_df['commit_message'] = raw_df['commit_message'].str.strip()
+        raw_df['commit_url'] = commit_base + raw_df['id']
+        return format_commit_df(raw_df, repo_name, 'LocalGit')
+
+    def _iter_log(self, path, revs):
+        # git log output is parsed as it is produced so large histories are never held in memory as text. stderr goes
+        # to a file rather than a pipe, so git cannot block on it while stdout is being read
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(['git', '-C', path, 'log', f'--format={log_format}'] + revs,
+                                    stdout=subprocess.PIPE, stderr=stderr_file, text=True, encoding='utf-8', errors='replace')
+            try:
+                buffer = ''
+                for chunk in iter(lambda: proc.stdout.read(1 << 16), ''):
+                    buffer += chunk
+                    *records, buffer = buffer.split(record_sep)
+                    for record in records:
+                        yield record.lstrip('\n').split(field_sep, 3)
+            finally:
+                proc.stdout.close()
+                proc.wait()
+
+            # Only reached when the whole log was read, a walk stopped early by the consumer is not a failure
+            if proc.returncode != 0:
+                stderr_file.seek(0)
+                raise Exception(f"git log failed for {path} - {stderr_file.read().decode('utf-8', errors='replace').strip()}")
+
+    def import_commit_data(self, repo_name, repo_id=None, since=None, stream=False, resume=None, branch_tips=None):
+        complete_msg = f'Completed importing local commit data from repository {repo_name}...'
+        path = self._get_repo_path(repo_name)
+        branch_dict = self._get_repo_branches(path)
+
+        # Branches whose tip has not moved since the last import have nothing new to fetch
+        branch_tips = branch_tips or dict()
+        changed_tips = {branch_dict[branch] for branch in branch_dict.keys() if branch_tips.get(branch) != branch_dict[branch]}
+        if len(changed_tips) == 0:
+            yield 'Complete', [complete_msg, None if stream else self._build_commit_df(repo_name, path, []), branch_dict]
+            return
+
+        # Every commit reachable from a changed tip but not from a previously synced tip, in one log walk
+        if len(branch_tips) > 0:
+            revs = ['--ignore-missing'] + sorted(changed_tips) + ['--not'] + sorted(set(branch_tips.values()))
+        else:
+            revs = (['--since', since] if since is not None else []) + sorted(changed_tips)
+
+        # The log order is fixed for a given set of revisions, so an interrupted import skips the commits it stored
+        log_key = hashlib.sha1(' '.join(revs).encode('utf-8')).hexdigest()
+        saved = (resume or dict()).get('*')
+        skip = int(saved['next_page']) if saved is not None and saved['tip'] == log_key and saved['next_page'] else 0
+
+        yield 'In Progress', f'Importing local commit data from repository {repo_name}...'
+
+        records = []
+        all_records = []
+        commits_read = 0
+        for record in self._iter_log(path, revs):
+            commits_read += 1
+            if commits_read <= skip:
+                continue
+
+            records.append(record)
+            if len(records) >= self.page_size:
+                if stream:
+                    yield 'Page', [self._build_commit_df(repo_name, path, records), {'branch': '*', 'tip': log_key, 'next_page': str(commits_read)}]
+                else:
+                    all_records.extend(records)
+                yield 'In Progress', f'Importing local commit data from repository {repo_name} ({commits_read} commits read)...'
+                records = []
+
+        if stream:
+            yield 'Page', [self._build_commit_df(repo_name, path, records), {'branch': '*', 'tip': log_key, 'next_page': None}]
+            yield 'Complete', [complete_msg, None, branch_dict]
+            return
+
+        all_records.extend(records)
+        yield 'In Progress', f'Processing local commit data ({len(all_records)} commits)...'
+        all_data = self._build_commit_df(repo_name, path, all_records)
+        yield 'Complete', [complete_msg, all_data, branch_dict]
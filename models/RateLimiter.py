@@ -0,0 +1,128 @@
+import threading
+import time
+import requests
+
+class RateLimitBucket:
+    def __init__(self, reserve_ratio=0.1, max_retries=3):
+        self.reserve_ratio = reserve_ratio
+        self.max_retries = max_retries
+
+        # Until the first response headers arrive nothing is known about the budget, so requests are not paced
+        self.limit = None
+        self.tokens = float('inf')
+        self.capacity = float('inf')
+        self.refill_rate = 0.0
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.updated = time.time()
+
+        self.throttled_time = 0.0
+        self.lock = threading.Lock()
+
+    def _header_value(self, headers, keys) -> float | None:
+        for key in keys:
+            value = headers.get(key)
+            if value is not None:
+                try:
+                    return float(value)
+                except ValueError:
+                    pass
+        return None
+
+    def _reserve(self) -> int:
+        return int(self.limit * self.reserve_ratio) if self.limit else 0
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                if self.reset_at is not None and now >= self.reset_at:
+                    # A new window starts with the full budget, and stays unpaced if no limit has been reported
+                    self.tokens = self.capacity = max(self.limit - self._reserve(), 1) if self.limit else float('inf')
+                    self.reset_at = None
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+                self.updated = now
+
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                if self.tokens >= 1:
+                    refill_wait = 0
+                else:
+                    refill_wait = (1 - self.tokens) / self.refill_rate if self.refill_rate > 0 else 1.0
+                wait = max(self.blocked_until - now, refill_wait, 0.01)
+
+            time.sleep(wait)
+            with self.lock:
+                self.throttled_time += wait
+
+    def update(self, res : requests.Response) -> bool:
+        # GitHub uses the X-RateLimit-* headers and GitLab the RateLimit-* headers
+        headers = res.headers
+        limit = self._header_value(headers, ['X-RateLimit-Limit', 'RateLimit-Limit'])
+        remaining = self._header_value(headers, ['X-RateLimit-Remaining', 'RateLimit-Remaining'])
+        reset = self._header_value(headers, ['X-RateLimit-Reset', 'RateLimit-Reset'])
+        retry_after = self._header_value(headers, ['Retry-After'])
+
+        with self.lock:
+            now = time.time()
+            if limit:
+                self.limit = limit
+
+            if self.limit and remaining is not None and reset is not None:
+                # Requests run at full speed until only the reserve is left, after which the reserve is
+                # spread evenly over the time remaining until the window resets. Without a known limit there is
+                # no reserve to hold back, so requests are not paced
+                seconds_to_reset = max(reset - now, 1)
+                available = max(remaining - self._reserve(), 0)
+                self.tokens = available
+                self.capacity = max(available, 1)
+                self.refill_rate = max(min(remaining, self._reserve()), 1) / seconds_to_reset
+                self.reset_at = reset
+                self.updated = now
+
+            if remaining is not None and reset is not None and remaining <= 0:
+                self.blocked_until = max(self.blocked_until, reset)
+
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+            rate_limited = res.status_code == 429 or (res.status_code == 403 and (remaining == 0 or retry_after is not None))
+            if rate_limited and self.blocked_until <= now:
+                self.blocked_until = now + 1    # Limited without saying for how long, so back off briefly
+
+        return rate_limited
+
+    def run(self, send) -> requests.Response:
+        for _ in range(self.max_retries + 1):
+            self.acquire()
+            res = send()
+            if not self.update(res):
+                break
+        return res
+
+    def get_throttled_time(self) -> float:
+        return self.throttled_time
+
+class RateLimitScheduler:
+    def __init__(self, reserve_ratio=0.1, max_retries=3):
+        self.reserve_ratio = reserve_ratio
+        self.max_retries = max_retries
+        self.buckets : dict[str:RateLimitBucket] = dict()
+        self.lock = threading.Lock()
+
+    def get_bucket(self, key) -> RateLimitBucket:
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = RateLimitBucket(self.reserve_ratio, self.max_retries)
+            return self.buckets[key]
+
+    def remove_bucket(self, key):
+        with self.lock:
+            self.buckets.pop(key, None)
+
+    def get_throttled_time(self, key) -> float:
+        bucket = self.buckets.get(key)
+        return bucket.get_throttled_time() if bucket is not None else 0.0
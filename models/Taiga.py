@@ -1,18 +1,65 @@
 import io
+import hashlib
 import pandas as pd
 import numpy as np
 import requests
 import traceback
+import time
+import concurrent.futures as cf
+from models.database.HttpCache import HttpCache
+from models.HttpClient import HttpClient, iter_ordered_pages
+import importlib.util
+import os
+
+## Columns read from Taiga's user story and task report exports, with the dtypes they are parsed as. Exports can have
+## many custom attribute columns, which are skipped while reading instead of being dropped afterwards
+us_report_columns = {
+    'id': 'Int64', 'ref': 'Int64', 'subject': 'string', 'is_closed': 'boolean', 'total-points': 'float64',
+    'sprint_id': 'Int64', 'sprint': 'string', 'sprint_estimated_start': 'string', 'sprint_estimated_finish': 'string'
+}
+task_report_columns = {
+    'id': 'Int64', 'ref': 'Int64', 'subject': 'string', 'user_story': 'Int64', 'sprint': 'string',
+    'is_closed': 'boolean', 'assigned_to': 'string', 'assigned_to_full_name': 'string'
+}
+
+## python-calamine reads xlsx files several times faster than openpyxl, so it is used when it is installed
+excel_engine = 'calamine' if importlib.util.find_spec('python_calamine') is not None else 'openpyxl'
+csv_chunk_threshold = 64 * 1024 * 1024
+csv_chunk_rows = 50000
+
+class _HashingReader(io.RawIOBase):
+    # Hashes the bytes of a streamed response as the CSV parser pulls them, so the body is never copied into a string
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        self.sha.update(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def hexdigest(self) -> str:
+        return self.sha.hexdigest()
 
 class TaigaDataServicer:
-    def __init__(self, username=None, password=None):
+    def __init__(self, username=None, password=None, http_cache : HttpCache = None, http_client : HttpClient = None, page_size=100, max_workers=4):
         self.base_url = "https://api.taiga.io/api/v1"
+        self.http_cache = http_cache
+        self.http_client = http_client or HttpClient()
         self.username = None
         self.password = None
         self.user_id = None
 
         self.token = None
         self.token_set_and_verified = False
+        self.endpoint_timings : dict[str:float] = dict()
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.report_validators : dict[str:dict] = dict()
 
         if username and password:
             self.username = username
@@ -62,12 +109,14 @@ class TaigaDataServicer:
     ## API CALL METHODS
     ##==================================================================================================================
 
-    def _api_token_header(self):
-        return {
+    def _api_token_header(self, paginate=False):
+        header = {
             "Content-Type": "application/json",
-            "Authorization": f'Bearer {self.token}',
-            "x-disable-pagination": 'True'
-        }    
+            "Authorization": f'Bearer {self.token}'
+        }
+        if not paginate:
+            header["x-disable-pagination"] = 'True'
+        return header
         
     def _extract_user_id(self):
         if not self.user_id:
@@ -112,7 +161,7 @@ class TaigaDataServicer:
         return pd.DataFrame(data=projects_data, columns=['id', 'project_name', 'project_owner', 'project_slug', 'is_selected'])
         
     def _make_post_api_req(self, url, header=None, data=None):
-        res = requests.post(url=url, headers=header, json=data)
+        res = self.http_client.post(url, headers=header, json=data)
         if res.status_code == 200:
             return res
         else:
@@ -121,12 +170,17 @@ class TaigaDataServicer:
                 token = self._refresh_token()
                 if token:
                     self.set_token(token)
-                    return requests.post(url=url, headers=self._api_token_header(), json=data)
+                    return self.http_client.post(url, headers=self._api_token_header(), json=data)
                 else: 
                     return res
     
+    def _http_get(self, url, header=None, data=None) -> requests.Response:
+        if self.http_cache is not None and data is None:
+            return self.http_cache.get(url, headers=header, client=self.http_client)
+        return self.http_client.get(url, headers=header, data=data)
+    
     def _make_get_api_req(self, url, header, data=None):
-        res = requests.get(url=url, headers=header, data=data)
+        res = self._http_get(url, header, data)
         if res.status_code == 200:
             return res
         else:
@@ -135,10 +189,25 @@ class TaigaDataServicer:
                 token = self._refresh_token()
                 if token:
                     self.set_token(token)
-                    return requests.get(url=url, headers=self._api_token_header(), json=data)
+                    return self._http_get(url, dict(header or {}, Authorization=f'Bearer {self.token}'), data)
                 else:
                     return res
                 
+    def _iter_api_pages(self, url):
+        def get_page(page) -> requests.Response:
+            return self._make_get_api_req(f"{url}{'&' if '?' in url else '?'}page={page}&page_size={self.page_size}", self._api_token_header(paginate=True))
+
+        def count_pages(first_res) -> int | None:
+            if first_res is None or first_res.status_code != 200:
+                return None
+            # Taiga reports the total count and the page size it actually used, which gives the number of pages
+            per_page = int(first_res.headers.get('x-paginated-by') or self.page_size)
+            return -(-int(first_res.headers.get('x-pagination-count') or 0) // per_page)
+
+        with cf.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for _, _, res in iter_ordered_pages(pool, get_page, 1, count_pages, self.max_workers):
+                yield res
+
     def _format_sprint_df(self, sprints : pd.DataFrame) -> pd.DataFrame:
         if sprints is not None:
             sprints = sprints.set_axis(['id', 'sprint_name', 'sprint_start', 'sprint_end'], axis=1)
@@ -162,214 +231,209 @@ class TaigaDataServicer:
             tasks_df.insert(4, 'is_coding', False)
         return tasks_df
 
+    def _get_display_names(self, unames : pd.Series, fnames : pd.Series) -> pd.Series:
+        # The shorter of the username and full name is displayed, falling back to whichever one is set
+        unames = unames.astype(pd.StringDtype())
+        fnames = fnames.astype(pd.StringDtype())
+        uname_valid = (unames.notna() & (unames != '')).fillna(False)
+        fname_valid = (fnames.notna() & (fnames != '')).fillna(False)
+        use_fname = fname_valid & (~uname_valid | (fnames.str.len() < unames.str.len()).fillna(False))
+        return unames.where(uname_valid, pd.NA).mask(use_fname, fnames)
+
+    def _normalize_members(self, raw_tasks_df : pd.DataFrame, tasks_df : pd.DataFrame) -> pd.DataFrame:
+        # Display names are worked out once per distinct assignee, then the assignee column is remapped in one pass
+        assignees = raw_tasks_df[['assigned_to', 'assigned_to_full_name']].dropna(subset=['assigned_to'])
+        assignees = assignees.drop_duplicates(subset=['assigned_to'], keep='first')
+        display_names = self._get_display_names(assignees['assigned_to'], assignees['assigned_to_full_name'])
+
+        tasks_df['assignee'] = tasks_df['assignee'].map(dict(zip(assignees['assigned_to'], display_names)))
+
+        members_df = pd.DataFrame({'id': pd.NA, 'username': display_names.dropna().drop_duplicates().to_numpy()})
+        return self._format_members_df(members_df)
+
+    def _parse_report_data(self, raw_us_df : pd.DataFrame, raw_tasks_df : pd.DataFrame) -> list[pd.DataFrame]:
+        us_df = self._format_us_df(raw_us_df[['id', 'ref', 'is_closed', 'sprint', 'total-points', 'subject']].copy(deep=True))
+        sprints_df = self._format_sprint_df(raw_us_df[['sprint_id', 'sprint', 'sprint_estimated_start', 'sprint_estimated_finish']].copy(deep=True))
+        tasks_df = self._format_task_df(raw_tasks_df.reindex(columns=['id', 'ref', 'user_story', 'sprint', 'is_closed', 'assigned_to', 'subject']))
+        members_df = self._normalize_members(raw_tasks_df, tasks_df)
+        return sprints_df, members_df, us_df, tasks_df
+
     def _inv_val_to_none(self, df: pd.DataFrame):
         df = df.replace(['', 'None', 'nan', 'NaN', np.nan, None], pd.NA)
     
-    def import_data_by_api(self, project_id) -> list[pd.DataFrame]:
-        def import_data(url):
-            header = {
-                "Content-Type": "application/json",
-                "Authorization": f'Bearer {self.token}',
-                "x-disable-pagination": 'True'
-            }
-            return self._make_get_api_req(url, header)
+    def _import_frame(self, endpoint, url, columns, paginate=False) -> pd.DataFrame | None:
+        # Only the columns that are used are pulled out of each page, so the raw json of a page can be dropped
+        # as soon as it has been read
+        start = time.perf_counter()
+        frames = []
+        for res in self._iter_api_pages(url) if paginate else [self._make_get_api_req(url, self._api_token_header())]:
+            if res is None or res.status_code != 200:
+                frames = None
+                break
+            frames.append(pd.DataFrame.from_records(res.json(), columns=columns))
+        self.endpoint_timings[endpoint] = time.perf_counter() - start
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    def get_entity_ids(self, project_id, entity, known_count=None) -> set | None:
+        # A single-item page carries the total count, so the full id listing is only needed when the count differs
+        # from what is stored (returns None when nothing was deleted or the listing failed)
+        url = f'{self.base_url}/{entity}?project={project_id}'
+        if known_count is not None:
+            res = self._make_get_api_req(f'{url}&page=1&page_size=1', self._api_token_header(paginate=True))
+            if res is not None and res.status_code == 200 and res.headers.get('x-pagination-count') == str(known_count):
+                return None
+
+        ids_df = self._import_frame(f'{entity}_ids', url, ['id'])
+        return set(ids_df['id'].tolist()) if ids_df is not None else None
+
+    def import_data_by_api(self, project_id, paginate=False, modified_since=None, known_us_df=None) -> list[pd.DataFrame]:
+        def import_frame(endpoint, url, columns) -> pd.DataFrame | None:
+            return self._import_frame(endpoint, url, columns, paginate)
         
-        def import_sprint_data() -> pd.DataFrame:
-            res = import_data(f'{self.base_url}/milestones?project={project_id}')
-            if res.status_code == 200:
-                raw_sprints_df = pd.json_normalize(res.json())
-                return self._format_sprint_df(raw_sprints_df[['id', 'name', 'estimated_start', 'estimated_finish']])
+        def import_member_frame(url) -> pd.DataFrame | None:
+            start = time.perf_counter()
+            res = self._make_get_api_req(url, self._api_token_header())
+            self.endpoint_timings['project'] = time.perf_counter() - start
+            if res is None or res.status_code != 200:
+                return None
+            return pd.DataFrame.from_records(res.json().get('members'), columns=['id', 'username', 'full_name_display', 'role_name'])
+        
+        def import_sprint_data(raw_sprints_df : pd.DataFrame) -> pd.DataFrame:
+            if raw_sprints_df is not None:
+                return self._format_sprint_df(raw_sprints_df)
             return None
 
-        def import_member_data() -> pd.DataFrame:
-            res = import_data(f'{self.base_url}/projects/{project_id}')
-            if res.status_code == 200:
-                raw_members_df = pd.json_normalize(res.json().get('members'))
+        def import_member_data(raw_members_df : pd.DataFrame) -> pd.DataFrame:
+            if raw_members_df is not None:
                 updated_raw_df = raw_members_df[raw_members_df['role_name'] == 'Product Owner']
 
-                headers = ['id', 'username']
-                data = []
-
-                for index, row in updated_raw_df.iterrows():
-                    mem_id = row['id']
-                    uname = row['username']
-                    fname = row['full_name_display']
-
-                    uname_valid = pd.notna(uname) and uname != ''
-                    fname_valid = pd.notna(fname) and fname != ''
-
-                    username = pd.NA
-                    if uname_valid:
-                        username = uname
-                    if fname_valid and len(fname) < len(uname):
-                        if not uname_valid or len(fname) < len(uname):
-                            username = fname
-
-                    data.append([mem_id, username])
-                members_df = pd.DataFrame(columns=headers, data=data)
+                members_df = pd.DataFrame({
+                    'id': updated_raw_df['id'],
+                    'username': self._get_display_names(updated_raw_df['username'], updated_raw_df['full_name_display'])
+                })
                 return self._format_members_df(members_df)
             return None
             
-        def import_us_data() -> pd.DataFrame:
-            res = import_data(f'{self.base_url}/userstories?project={project_id}')
-            if res.status_code == 200:
-                raw_us_df = pd.json_normalize(res.json())
-                return self._format_us_df(raw_us_df[['id', 'ref', 'is_closed', 'milestone_name', 'total_points', 'subject']])
+        def import_us_data(raw_us_df : pd.DataFrame) -> pd.DataFrame:
+            if raw_us_df is not None:
+                return self._format_us_df(raw_us_df)
             return None
             
-        def import_task_data(member_df : pd.DataFrame, us_df : pd.DataFrame, sprint_dict: dict) -> pd.DataFrame:
-            res = import_data(f'{self.base_url}/tasks?project={project_id}')
-            if res.status_code == 200:
-                raw_task_df = pd.json_normalize(res.json())
-                
-                headers = ['id', 'ref', 'us_num', 'sprint', 'is_closed', 'assigned_to', 'subject']
-                data = []
-
-                for _, row in raw_task_df.iterrows():
-                    task_id = row['id']
-                    task = row['ref']
-                    closed = row['is_closed']
-
-                    try:
-                        us_id = row['user_story']
-                        us = us_df.loc[us_df['id'] == us_id, 'us_num'].iloc[0]
-                    except:
-                        us = pd.NA
-
-                    try:
-                        sprint = sprint_dict[row['milestone']]
-                    except:
-                        sprint = pd.NA
-
-                    try:
-                        mem_id = row['assigned_to']
-                        username = member_df.loc[member_df['id'] == mem_id, 'username'].iloc[0]
-                    except:
-                        username = pd.NA
-
-                    subject = row['subject']
-
-                    row_data = [task_id, task, us, sprint, closed, username, subject]
-                    data.append(row_data)
-                tasks_df = pd.DataFrame(columns=headers, data=data)
+        def import_task_data(raw_task_df : pd.DataFrame, member_df : pd.DataFrame, us_df : pd.DataFrame, sprint_dict: dict) -> pd.DataFrame:
+            if raw_task_df is not None:
+                # Stories and members are indexed by id once, so each task column is enriched with a single hashed lookup.
+                # A delta sync only fetches changed stories, so the ones already stored are included in the lookup
+                if known_us_df is not None:
+                    us_df = pd.concat([us_df[['id', 'us_num']], known_us_df[['id', 'us_num']]])
+                us_lookup = us_df.drop_duplicates(subset=['id']).set_index('id')['us_num']
+                member_lookup = member_df.dropna(subset=['id']).drop_duplicates(subset=['id']).set_index('id')['username']
+
+                tasks_df = pd.DataFrame({
+                    'id': raw_task_df['id'],
+                    'ref': raw_task_df['ref'],
+                    'us_num': raw_task_df['user_story'].map(us_lookup).astype(pd.Int64Dtype()),
+                    'sprint': raw_task_df['milestone'].map(sprint_dict),
+                    'is_closed': raw_task_df['is_closed'],
+                    'assigned_to': raw_task_df['assigned_to'].map(member_lookup),
+                    'subject': raw_task_df['subject']
+                })
                 return self._format_task_df(tasks_df)
             return None
 
-        sprints_df = import_sprint_data()
-
-        sprints_dict = dict()
-        for _, row in sprints_df[['id', 'sprint_name']].dropna().drop_duplicates().iterrows():
-            sprints_dict[row['id']] = row['sprint_name']
-
-        members_df = import_member_data()
-        us_df = import_us_data()
-        task_df = import_task_data(members_df, us_df, sprints_dict)
+        # None of the endpoints depend on each other, so all four are fetched at once and only joined afterwards.
+        # With pagination the story and task pages are also fetched concurrently within each endpoint
+        modified_filter = f'&modified_date__gt={modified_since}' if modified_since is not None else ''
+        self.endpoint_timings = dict()
+        with cf.ThreadPoolExecutor(max_workers=4) as pool:
+            sprints_future = pool.submit(import_frame, 'milestones', f'{self.base_url}/milestones?project={project_id}',
+                                         ['id', 'name', 'estimated_start', 'estimated_finish'])
+            members_future = pool.submit(import_member_frame, f'{self.base_url}/projects/{project_id}')
+            us_future = pool.submit(import_frame, 'userstories', f'{self.base_url}/userstories?project={project_id}{modified_filter}',
+                                    ['id', 'ref', 'is_closed', 'milestone_name', 'total_points', 'subject'])
+            tasks_future = pool.submit(import_frame, 'tasks', f'{self.base_url}/tasks?project={project_id}{modified_filter}',
+                                       ['id', 'ref', 'user_story', 'milestone', 'is_closed', 'assigned_to', 'subject'])
+
+            sprints_df = import_sprint_data(sprints_future.result())
+            members_df = import_member_data(members_future.result())
+            us_df = import_us_data(us_future.result())
+            raw_task_df = tasks_future.result()
+
+        sprints_dict = sprints_df[['id', 'sprint_name']].dropna().drop_duplicates(subset=['id']).set_index('id')['sprint_name'].to_dict()
+        task_df = import_task_data(raw_task_df, members_df, us_df, sprints_dict)
 
         return sprints_df, members_df, us_df, task_df
     
-    def _import_data_by_urls(self, us_url, task_url):
-        def import_csv_by_url(url) -> pd.DataFrame:
-            raw_data = None
-            if url != "" and url is not None:
-                res = requests.get(url)._content
-                raw_data = pd.read_csv(io.StringIO(res.decode('utf-8')))
-            return raw_data
-        
-        def parse_sprints(df : pd.DataFrame) -> pd.DataFrame:
-            return self._format_sprint_df(df)
-        
-        def parse_members(df : pd.DataFrame, tasks_df : pd.DataFrame) -> pd.DataFrame:
-            headers = ['id', 'username']
-            data = []
-
-            for _, row in df.iterrows():
-                uname = row['assigned_to']
-                fname = row['assigned_to_full_name']
-
-                uname_valid = pd.notna(uname) and uname != ''
-                fname_valid = pd.notna(fname) and fname != ''
-
-                username = pd.NA
-                if uname_valid:
-                    username = uname
-                if fname_valid and len(fname) < len(uname):
-                    if not uname_valid or len(fname) < len(uname):
-                        username = fname
-
-                tasks_df.loc[tasks_df['assignee'] == uname, 'assignee'] = username
-
-                data.append([pd.NA, username])
-            members_df = pd.DataFrame(columns=headers, data=data)
-            return self._format_members_df(members_df)
-
-        def import_us_csv(url) -> pd.DataFrame:
-            raw_us_df = import_csv_by_url(url)
-            us_df = self._format_us_df(raw_us_df[['id', 'ref', 'is_closed', 'sprint', 'total-points', 'subject']].copy(deep=True))
-            sprint_df = parse_sprints(raw_us_df[['sprint_id', 'sprint', 'sprint_estimated_start', 'sprint_estimated_finish']].copy(deep=True))
-            return sprint_df, us_df
-
-        def import_task_csv(url) -> pd.DataFrame:
-            raw_tasks_df = import_csv_by_url(url)
-            tasks_df = self._format_task_df(raw_tasks_df[['id', 'ref', 'user_story', 'is_closed', 'assigned_to', 'subject']].copy(deep=True))
-            members_df = parse_members(raw_tasks_df[['assigned_to', 'assigned_to_full_name']], tasks_df)
-            return members_df, tasks_df
-
-        if us_url and task_url:
-            sprints_df, us_df = import_us_csv(us_url)
-            members_df, task_df = import_task_csv(task_url)
-        return sprints_df, members_df, us_df, task_df
+    def get_endpoint_timings(self) -> dict[str:float]:
+        return self.endpoint_timings
+    
+    def get_report_validators(self) -> dict[str:dict]:
+        return self.report_validators
+
+    def _read_report_url(self, url, columns : dict[str:str], validator : dict = None) -> tuple[pd.DataFrame | None, dict, bool]:
+        # Returns the parsed report, the validators to send next time and whether the report changed since 'validator'
+        validator = validator or dict()
+        header = dict()
+        if validator.get('etag'):
+            header['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            header['If-Modified-Since'] = validator['last_modified']
+
+        # Reports bypass the http cache, since a cached copy would be handed back (and re-parsed) on every 304
+        res = self.http_client.get(url, headers=header, stream=True)
+        try:
+            if res.status_code == 304:
+                return None, validator, False
+            res.raise_for_status()
+
+            res.raw.decode_content = True
+            reader = _HashingReader(res.raw)
+            raw_data = pd.read_csv(io.BufferedReader(reader), usecols=lambda col: col in columns, dtype=columns)
+        finally:
+            res.close()
+
+        new_validator = {
+            'etag': res.headers.get('ETag'),
+            'last_modified': res.headers.get('Last-Modified'),
+            'content_hash': reader.hexdigest()
+        }
+        return raw_data.reindex(columns=list(columns.keys())), new_validator, new_validator['content_hash'] != validator.get('content_hash')
+
+    def _import_data_by_urls(self, us_url, task_url, validators : dict[str:dict] = None):
+        # Returns all None when neither report changed since 'validators' were saved
+        if not (us_url and task_url):
+            return None, None, None, None
+
+        validators = validators or dict()
+        us_df, us_validator, us_changed = self._read_report_url(us_url, us_report_columns, validators.get(us_url))
+        task_df, task_validator, task_changed = self._read_report_url(task_url, task_report_columns, validators.get(task_url))
+        self.report_validators = {us_url: us_validator, task_url: task_validator}
+        if not us_changed and not task_changed:
+            return None, None, None, None
+
+        # Tasks are joined against stories, so a report answered with 304 is still needed in full when the other changed
+        if us_df is None:
+            us_df = self._read_report_url(us_url, us_report_columns)[0]
+        if task_df is None:
+            task_df = self._read_report_url(task_url, task_report_columns)[0]
+        return self._parse_report_data(us_df, task_df)
+
+    def _read_report_file(self, fp, columns : dict[str:str]) -> pd.DataFrame:
+        raw_data = None
+        if fp is not None and fp != '':
+            usecols = lambda col: col in columns
+            match fp.split(".")[-1]:
+                case 'csv':
+                    # Huge exports are parsed in chunks so only one chunk of raw text is held at a time
+                    if os.path.getsize(fp) > csv_chunk_threshold:
+                        chunks = pd.read_csv(fp, usecols=usecols, dtype=columns, chunksize=csv_chunk_rows)
+                        raw_data = pd.concat(chunks, ignore_index=True)
+                    else:
+                        raw_data = pd.read_csv(fp, usecols=usecols, dtype=columns)
+                case 'xlsx':
+                    raw_data = pd.read_excel(fp, usecols=usecols, dtype=columns, engine=excel_engine)
+        return raw_data.reindex(columns=list(columns.keys())) if raw_data is not None else None
 
     def _import_data_by_files(self, us_fp, task_fp):
-        def import_by_file(fp) -> pd.DataFrame:
-            raw_data = None
-            if fp is not None and fp != '':
-                match fp.split(".")[-1]:
-                    case 'csv':
-                        raw_data = pd.read_csv(fp)
-                    case 'xlsx':
-                        raw_data = pd.read_excel(fp)
-                return raw_data
-
-        def parse_sprints(df : pd.DataFrame) -> pd.DataFrame:
-            return self._format_sprint_df(df)
-        
-        def parse_members(df : pd.DataFrame, tasks_df : pd.DataFrame) -> pd.DataFrame:
-            headers = ['id', 'username']
-            data = []
-
-            for _, row in df.iterrows():
-                uname = row['assigned_to']
-                fname = row['assigned_to_full_name']
-
-                uname_valid = pd.notna(uname) and uname != ''
-                fname_valid = pd.notna(fname) and fname != ''
-
-                username = pd.NA
-                if uname_valid:
-                    username = uname
-                if fname_valid and len(fname) < len(uname):
-                    if not uname_valid or len(fname) < len(uname):
-                        username = fname
-
-                tasks_df.loc[tasks_df['assignee'] == uname, 'assignee'] = username
-
-                data.append([pd.NA, username])
-            members_df = pd.DataFrame(columns=headers, data=data)
-            return self._format_members_df(members_df)
-
-        def import_us_data_by_file(fp) -> pd.DataFrame:
-            raw_us_df = import_by_file(fp)
-            us_df = self._format_us_df(raw_us_df[['id', 'ref', 'is_closed', 'sprint', 'total-points', 'subject']].copy(deep=True))
-            sprint_df = parse_sprints(raw_us_df[['sprint_id', 'sprint', 'sprint_estimated_start', 'sprint_estimated_finish']].copy(deep=True))
-            return sprint_df, us_df
-
-        def import_task_data_by_file(fp) -> pd.DataFrame:
-            raw_tasks_df = import_by_file(fp)
-            tasks_df = self._format_task_df(raw_tasks_df[['id', 'ref', 'user_story', 'is_closed', 'assigned_to', 'subject']].copy(deep=True))
-            members_df = parse_members(raw_tasks_df[['assigned_to', 'assigned_to_full_name']], tasks_df)
-            return members_df, tasks_df
-
         if us_fp and task_fp:
-            sprints_df, us_df = import_us_data_by_file(us_fp)
-            members_df, task_df = import_task_data_by_file(task_fp)
-        return sprints_df, members_df, us_df, task_df
\ No newline at end of file
+            return self._parse_report_data(self._read_report_file(us_fp, us_report_columns), self._read_report_file(task_fp, task_report_columns))
+        return None, None, None, None
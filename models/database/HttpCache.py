@@ -0,0 +1,164 @@
+import sqlite3 as db
+import threading
+import hashlib
+import json
+import time
+import requests
+from models.HttpClient import HttpClient
+from requests.structures import CaseInsensitiveDict
+
+cache_schema = """CREATE TABLE IF NOT EXISTS http_cache (
+    cache_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT,
+    body BLOB,
+    body_size INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL,
+    PRIMARY KEY(cache_key)
+);"""
+
+## Headers that identify who is asking, so the same URL requested with different credentials is cached separately
+auth_headers = ['Authorization', 'PRIVATE-TOKEN']
+
+## Headers describing the body, which a 304 does not send (or sends for its own empty body)
+body_headers = ['content-length', 'content-encoding', 'content-type', 'transfer-encoding']
+
+class HttpCache:
+    def __init__(self, db_filepath='./http_cache.db', max_bytes=256 * 1024 * 1024, commit_interval=1.0):
+        self.max_bytes = max_bytes
+        self.commit_interval = commit_interval
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+        self.lock = threading.Lock()
+        self.conn = db.connect(db_filepath, check_same_thread=False)
+        # Losing the last few writes of a cache only costs a refetch, so the journal is not synced on every commit
+        self.conn.execute('PRAGMA journal_mode = WAL;')
+        self.conn.execute('PRAGMA synchronous = NORMAL;')
+        self.conn.execute(cache_schema)
+        self.conn.commit()
+
+        # The size of the cache is kept in memory so stores only need to look at the table when it is over max_bytes
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(body_size), 0) FROM http_cache;").fetchone()[0]
+        self.last_commit = time.time()
+
+    def close(self):
+        if self.conn:
+            with self.lock:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
+    def _cache_key(self, url, headers) -> str:
+        identity = [url] + [str(headers.get(key)) for key in auth_headers if headers and headers.get(key)]
+        return hashlib.sha256('\n'.join(identity).encode('utf-8')).hexdigest()
+
+    def _lookup(self, key):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT etag, last_modified, headers, body FROM http_cache WHERE cache_key = ?;", (key,)
+            ).fetchone()
+
+    def _store(self, key, url, res : requests.Response):
+        etag = res.headers.get('ETag')
+        last_modified = res.headers.get('Last-Modified')
+        body = res.content
+
+        with self.lock:
+            replaced = self.conn.execute("SELECT body_size FROM http_cache WHERE cache_key = ?;", (key,)).fetchone()
+            self.conn.execute(
+                """INSERT OR REPLACE INTO http_cache (cache_key, url, etag, last_modified, headers, body, body_size, hits, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?);""",
+                (key, url, etag, last_modified, json.dumps(dict(res.headers)), body, len(body), time.time())
+            )
+            self.total_bytes += len(body) - (replaced[0] if replaced else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self._commit_if_due()
+
+    def _touch(self, key, body_size):
+        # The session counters are shared by the concurrent page fetchers, so they are updated under the same lock
+        with self.lock:
+            self.conn.execute("UPDATE http_cache SET hits = hits + 1, last_access = ? WHERE cache_key = ?;", (time.time(), key))
+            self.hits += 1
+            self.bytes_saved += body_size
+            self._commit_if_due()
+
+    def _commit_if_due(self):
+        # Writes from the concurrent page fetchers are committed together at most once per commit_interval
+        now = time.time()
+        if now - self.last_commit >= self.commit_interval:
+            self.conn.commit()
+            self.last_commit = now
+
+    def _evict(self):
+        # Least recently used entries are dropped until the cache fits within max_bytes again
+        for key, size in self.conn.execute("SELECT cache_key, body_size FROM http_cache ORDER BY last_access ASC;").fetchall():
+            self.conn.execute("DELETE FROM http_cache WHERE cache_key = ?;", (key,))
+            self.total_bytes -= size
+            if self.total_bytes <= self.max_bytes:
+                break
+
+    def _build_response(self, url, headers, body, live_headers=None) -> requests.Response:
+        res = requests.Response()
+        res.status_code = 200
+        res.url = url
+        res.headers = CaseInsensitiveDict(json.loads(headers))
+        # The 304's own headers are current (rate limit budget, links, validators), so they replace the stored ones
+        for name, value in (live_headers or {}).items():
+            if name.lower() not in body_headers:
+                res.headers[name] = value
+        res.encoding = requests.utils.get_encoding_from_headers(res.headers)
+        res._content = body
+        return res
+
+    def get(self, url, headers=None, client : HttpClient = None, **kwargs) -> requests.Response:
+        key = self._cache_key(url, headers)
+        entry = self._lookup(key)
+
+        req_headers = dict(headers or {})
+        if entry:
+            etag, last_modified, _, _ = entry
+            if etag:
+                req_headers['If-None-Match'] = etag
+            if last_modified:
+                req_headers['If-Modified-Since'] = last_modified
+
+        res = (client or requests).get(url, headers=req_headers, **kwargs)
+
+        if res.status_code == 304 and entry:
+            _, _, cached_headers, body = entry
+            self._touch(key, len(body))
+            return self._build_response(url, cached_headers, body, res.headers)
+
+        with self.lock:
+            self.misses += 1
+        if res.status_code == 200 and (res.headers.get('ETag') or res.headers.get('Last-Modified')):
+            self._store(key, url, res)
+        return res
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM http_cache;")
+            self.conn.commit()
+            self.total_bytes = 0
+            self.last_commit = time.time()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            entries, total_bytes, saved_all_time = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(body_size), 0), COALESCE(SUM(hits * body_size), 0) FROM http_cache;"
+            ).fetchone()
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes_saved': self.bytes_saved,
+                'entries': entries,
+                'cache_bytes': total_bytes,
+                'bytes_saved_all_time': saved_all_time
+            }
@@ -3,6 +3,10 @@ import numpy as np
 import pandas as pd
 from urllib.request import pathname2url
 import base64
+import re
+import threading
+from datetime import datetime
+from contextlib import contextmanager
 
 ## Used when needing to 
 sql_schema = {
@@ -12,6 +16,8 @@ sql_schema = {
         user_pwd TEXT,
         nickname TEXT,
         site_token TEXT,
+        host_url TEXT,
+        api_type TEXT,
         PRIMARY KEY(nickname)
     );""",
     'taiga_projects': """CREATE TABLE IF NOT EXISTS taiga_projects (
@@ -25,6 +31,9 @@ sql_schema = {
     'taiga_csv_urls': """CREATE TABLE IF NOT EXISTS taiga_csv_urls (
         dname TEXT NOT NULL,
         durl TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        content_hash TEXT,
         PRIMARY KEY(dname)
     );""",
     'members': """CREATE TABLE IF NOT EXISTS members (
@@ -36,8 +45,8 @@ sql_schema = {
     'sprints': """CREATE TABLE IF NOT EXISTS sprints (
         id INTEGER,
         sprint_name TEXT NOT NULL UNIQUE,
-        sprint_start INTEGER,
-        sprint_end INTEGER,
+        sprint_start TEXT,
+        sprint_end TEXT,
         PRIMARY KEY(id AUTOINCREMENT)
     );""",
     'userstories': """CREATE TABLE IF NOT EXISTS userstories (
@@ -78,15 +87,74 @@ sql_schema = {
         repo_name TEXT NOT NULL,
         task_num INTEGER,
         committer TEXT,
-        az_date INTEGER NOT NULL,
-        utc_datetime INTEGER NOT NULL,
+        az_date TEXT NOT NULL,
+        utc_datetime TEXT NOT NULL,
         commit_message TEXT,
         commit_url TEXT NOT NULL,
         PRIMARY KEY(id, repo_name),
         FOREIGN KEY(task_num) REFERENCES tasks(task_num)
+    );""",
+    'commit_import_cursors': """CREATE TABLE IF NOT EXISTS commit_import_cursors (
+        repo_name TEXT NOT NULL,
+        site_nickname TEXT NOT NULL,
+        branch TEXT NOT NULL,
+        tip_sha TEXT,
+        from_sha TEXT,
+        next_page TEXT,
+        PRIMARY KEY(repo_name, site_nickname, branch)
+    );""",
+    'taiga_sync': """CREATE TABLE IF NOT EXISTS taiga_sync (
+        project_id INTEGER NOT NULL,
+        last_sync_dt TEXT NOT NULL,
+        PRIMARY KEY(project_id)
+    );""",
+    'repo_branches': """CREATE TABLE IF NOT EXISTS repo_branches (
+        repo_name TEXT NOT NULL,
+        site_nickname TEXT NOT NULL,
+        branch TEXT NOT NULL,
+        tip_sha TEXT NOT NULL,
+        last_sync_dt TEXT,
+        PRIMARY KEY(repo_name, site_nickname, branch)
     );"""
 }
 
+## Columns added after a table was first released, which older databases are migrated to on startup
+added_columns = {
+    'sites': {'host_url': 'TEXT', 'api_type': 'TEXT'},
+    'commit_import_cursors': {'from_sha': 'TEXT'},
+    'taiga_csv_urls': {'etag': 'TEXT', 'last_modified': 'TEXT', 'content_hash': 'TEXT'}
+}
+
+## Secondary indexes for the commit report filters (select_between), which take a date range alone or together with a repo,
+## task or committer
+sql_indexes = {
+    'idx_commits_time': 'CREATE INDEX IF NOT EXISTS idx_commits_time ON commits (utc_datetime);',
+    'idx_commits_repo_time': 'CREATE INDEX IF NOT EXISTS idx_commits_repo_time ON commits (repo_name, utc_datetime);',
+    'idx_commits_task': 'CREATE INDEX IF NOT EXISTS idx_commits_task ON commits (task_num, utc_datetime);',
+    'idx_commits_committer': 'CREATE INDEX IF NOT EXISTS idx_commits_committer ON commits (committer, utc_datetime);'
+}
+
+## Timestamps are stored as ISO-8601 text in UTC (e.g. '2024-01-02 10:00:00+00:00') and dates as 'YYYY-MM-DD', so they
+## sort and compare correctly inside sqlite. Loaded tables map these columns straight to the listed dtypes
+column_dtypes = {
+    'commits': {'task_num': 'Int64', 'utc_datetime': 'utc_datetime'},
+    'sprints': {'id': 'Int64', 'sprint_start': 'date', 'sprint_end': 'date'},
+    'userstories': {'id': 'Int64', 'us_num': 'Int64', 'is_complete': 'boolean', 'points': 'Int64'},
+    'tasks': {'id': 'Int64', 'task_num': 'Int64', 'us_num': 'Int64', 'is_coding': 'boolean', 'is_complete': 'boolean'}
+}
+
+## Data migrations for databases whose user_version is older than the key, so stored rows match the current formats
+schema_migrations = {
+    # Sprint dates were stored as 'MM/DD/YYYY'
+    1: [
+        f"""UPDATE sprints SET {col} = substr({col}, 7, 4) || '-' || substr({col}, 1, 2) || '-' || substr({col}, 4, 2)
+            WHERE {col} LIKE '__/__/____';""" for col in ['sprint_start', 'sprint_end']
+    ],
+    # Task lookups are not queried by key, so these indexes only slowed down task writes
+    2: ['DROP INDEX IF EXISTS idx_tasks_task_num;', 'DROP INDEX IF EXISTS idx_tasks_us_num;']
+}
+schema_version = max(schema_migrations.keys())
+
 init_statements = {
     'sites': """INSERT OR IGNORE INTO sites (site_name, username, user_pwd, nickname, site_token) VALUES
                 ('Taiga', NULL, NULL, 'Taiga', NULL);""",
@@ -95,29 +163,87 @@ init_statements = {
                         ('task', NULL);"""
 }
 
+## Applied to every connection. WAL lets the UI keep reading while an import thread writes, and under WAL a
+## synchronous level of NORMAL cannot corrupt the database, it only defers the fsync to checkpoints
+connection_pragmas = [
+    'PRAGMA journal_mode=WAL;',
+    'PRAGMA synchronous=NORMAL;',
+    'PRAGMA cache_size=-65536;',
+    'PRAGMA mmap_size=268435456;',
+    'PRAGMA temp_store=MEMORY;',
+    'PRAGMA busy_timeout=10000;'
+]
+
+## Aggregates that select() accepts in place of a plain column name, e.g. 'MAX(utc_datetime)'
+aggregate_pattern = re.compile(r'^(?:MAX|MIN|COUNT|SUM|AVG)\((\*|\w+)\)$', re.IGNORECASE)
+
 class RecDB:
-    conn = None
-    cursor = None
+    schema = None
+    primary_keys = None
 
     def __init__(self, db_filepath='./capstone_data.db'):
+        self.filepath = db_filepath
+        # Each thread gets its own connection and cursor, and writes from different threads are serialized
+        self.local = threading.local()
+        self.connections : dict[threading.Thread:db.Connection] = dict()
+        self.connections_lock = threading.Lock()
+        self.write_lock = threading.RLock()
         self._connect_or_create_db(db_filepath)
+
+    @property
+    def conn(self) -> db.Connection:
+        if getattr(self.local, 'conn', None) is None:
+            self._open_connection(self.filepath)
+        return self.local.conn
+
+    @property
+    def cursor(self) -> db.Cursor:
+        if getattr(self.local, 'cursor', None) is None:
+            self._open_connection(self.filepath)
+        return self.local.cursor
+
+    @property
+    def batch_depth(self) -> int:
+        return getattr(self.local, 'batch_depth', 0)
+
+    @batch_depth.setter
+    def batch_depth(self, depth):
+        self.local.batch_depth = depth
+
+    def _open_connection(self, target, uri=False):
+        conn = db.connect(target, check_same_thread=False, uri=uri, timeout=10)
+        for pragma in connection_pragmas:
+            conn.execute(pragma)
+
+        self.local.conn = conn
+        self.local.cursor = conn.cursor()
+        with self.connections_lock:
+            # The UI starts a short-lived thread per action, so connections left behind by finished threads are closed here
+            for thread in [thread for thread in self.connections.keys() if not thread.is_alive()]:
+                self.connections.pop(thread).close()
+            replaced = self.connections.get(threading.current_thread())
+            if replaced is not None:
+                replaced.close()
+            self.connections[threading.current_thread()] = conn
         
     def _connect_or_create_db(self, filepath):
         try:
             uri = 'file:{}?mode=rw'.format(pathname2url(filepath))
-            self.conn = db.connect(uri, check_same_thread=False, uri=True)
-            self.cursor = self.conn.cursor()
+            self._open_connection(uri, uri=True)
             self.validate_db()
         except db.OperationalError:
-            self.conn = db.connect(filepath, check_same_thread=False)
-            self.cursor = self.conn.cursor()
+            self._open_connection(filepath)
             # try: 
             for statement in sql_schema.values():
                 self.cursor.execute(statement)
             for statement in init_statements.values():
                 self.cursor.execute(statement)
+            for statement in sql_indexes.values():
+                self.cursor.execute(statement)
+            self.cursor.execute(f'PRAGMA user_version = {schema_version};')
 
             self.conn.commit()
+            self._invalidate_schema()
             # except Exception:
                 # self.conn.close()
                 # if os.path.exists(filepath):
@@ -125,29 +251,133 @@ class RecDB:
                 # raise db.DatabaseError("Error initializing database")
             
     def close(self):
-        if self.conn:
-            self.conn.close()
+        with self.connections_lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
 
     def validate_db(self):
-        for table in sql_schema.keys():
-            init_stmt = init_statements.get(table)
-            if not self.validate_table_exists(table):
-                table_statement = sql_schema[table]
-                self.cursor.execute(table_statement)
-            if init_stmt:
-                self.cursor.execute(init_stmt)
-        self.conn.commit()
+        # The schema cache is rebuilt as tables, columns and indexes are added, so other threads wait until it is done
+        with self.write_lock:
+            schema_changed = False
+            for table in sql_schema.keys():
+                if not self.validate_table_exists(table):
+                    self.cursor.execute(sql_schema[table])
+                    schema_changed = True
+                    continue
+                if len(self._get_primary_keys(table)) == 0:
+                    self._rebuild_table(table)
+                    schema_changed = True
+                for col, col_type in added_columns.get(table, {}).items():
+                    if col not in self.get_table_columns(table):
+                        self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_type};")
+                        schema_changed = True
+
+            version = self.cursor.execute('PRAGMA user_version;').fetchone()[0]
+            for migration_version in sorted(schema_migrations.keys()):
+                if migration_version > version:
+                    for statement in schema_migrations[migration_version]:
+                        self.cursor.execute(statement)
+                    self.cursor.execute(f'PRAGMA user_version = {migration_version};')
+                    schema_changed = True
+
+            indexes = {row[0] for row in self.cursor.execute("SELECT name FROM sqlite_master WHERE type='index';").fetchall()}
+            for name, statement in sql_indexes.items():
+                if name not in indexes:
+                    self.cursor.execute(statement)
+                    schema_changed = True
+
+            # Seed rows are inserted when the database was created or migrated, not on every startup
+            if schema_changed:
+                for statement in init_statements.values():
+                    self.cursor.execute(statement)
+                self.conn.commit()
+                self._invalidate_schema()
+
+    def _rebuild_table(self, table):
+        # Older versions saved tables with to_sql, which recreated them without their declared keys and constraints.
+        # The declared table is restored and the stored rows copied back, skipping any that break its constraints
+        with self.write_lock:
+            old_cols = self.get_table_columns(table)
+            self.cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{table}_old";')
+            self.cursor.execute(sql_schema[table])
+            self._invalidate_schema()
+
+            cols = ', '.join(col for col in self.get_table_columns(table) if col in old_cols)
+            self.cursor.execute(f'INSERT OR IGNORE INTO {table} ({cols}) SELECT {cols} FROM "{table}_old";')
+            self.cursor.execute(f'DROP TABLE "{table}_old";')
+            self._invalidate_schema()
+
+    def _load_schema(self) -> dict[str:list[str]]:
+        # Table and column names are read once per connection and only reloaded after DDL. The cache is shared by
+        # every thread, so it is filled and invalidated under write_lock and only published once it is complete.
+        # A published cache is read without the lock, so reads do not wait on another thread's batch
+        schema = self.schema
+        if schema is not None:
+            return schema
+        with self.write_lock:
+            if self.schema is None:
+                tables = [row[0] for row in self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()]
+                schema = dict()
+                primary_keys = dict()
+                for table in tables:
+                    info = self.cursor.execute(f'PRAGMA table_info("{table}");').fetchall()
+                    schema[table] = [row[1] for row in info]
+                    primary_keys[table] = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5] > 0]
+                self.primary_keys = primary_keys
+                self.schema = schema
+            return self.schema
+
+    def _get_primary_keys(self, table) -> list[str]:
+        primary_keys = self.primary_keys
+        if primary_keys is None:
+            with self.write_lock:
+                self._load_schema()
+                primary_keys = self.primary_keys
+        return primary_keys.get(table, [])
+
+    def _invalidate_schema(self):
+        with self.write_lock:
+            self.schema = None
+            self.primary_keys = None
+
+    def _has_primary_key(self, table, key_cols) -> bool:
+        return len(key_cols) > 0 and set(self._get_primary_keys(table)) == set(key_cols)
+
+    @contextmanager
+    def batch(self):
+        # Writes made inside the block share one transaction, committed when the outermost block exits
+        # and rolled back if it raises. Writers on other threads wait until then
+        with self.write_lock:
+            self.batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self.batch_depth == 1:
+                    self.conn.rollback()
+                raise
+            else:
+                if self.batch_depth == 1:
+                    self.conn.commit()
+            finally:
+                self.batch_depth -= 1
+
+    def _validate_columns(self, table, cols, allow_aggregates=False):
+        # Identifiers are formatted into the SQL, so anything that is not a known column of the table is rejected
+        table_cols = self._load_schema()[table]
+        for col in cols:
+            match = aggregate_pattern.match(col) if allow_aggregates else None
+            name = match.group(1) if match else col
+            if name not in table_cols and not (match and name == '*'):
+                raise db.OperationalError(f'no such column: {col}')
 
     def validate_table_exists(self, table_name) -> bool:
-        self.cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name=?;",
-            ([table_name])
-        )
-        result = self.cursor.fetchone()
-        return result is not None
+        return table_name in self._load_schema()
 
     def insert(self, table, data, cond=None):
         if self.validate_table_exists(table):
+            self._validate_columns(table, list(data.keys()) + list((cond or {}).keys()))
             columns = ', '.join(data.keys())
             placeholders = ', '.join('?' * len(data))
 
@@ -159,6 +389,7 @@ class RecDB:
                     set_placeholder += f', {key} = ?'
             
             conditions_placeholder = ''
+            cond_args = ()
             if cond is not None:
                 conditions_placeholder = ' WHERE '
                 for key in cond.keys():
@@ -173,14 +404,40 @@ class RecDB:
 
             query1 = f"INSERT OR IGNORE INTO {table} ({columns}) VALUES ({placeholders});"
             query2 = f"UPDATE {table} SET {set_placeholder}{conditions_placeholder};"
-            self.cursor.execute(query1, tuple(data.values()))
-            self.cursor.execute(query2, exe_args or ())
-            self.conn.commit()
+            with self.batch():
+                self.cursor.execute(query1, tuple(data.values()))
+                self.cursor.execute(query2, exe_args or ())
+            return True
+        return False
+
+    def _write_rows(self, table, cols, key_cols, rows):
+        placeholders = ', '.join('?' * len(cols))
+        if self._has_primary_key(table, key_cols):
+            updates = ', '.join(f'{col} = excluded.{col}' for col in cols if col not in key_cols)
+            on_conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+            self.cursor.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({placeholders}) ON CONFLICT({', '.join(key_cols)}) {on_conflict};", rows)
+        else:
+            # A table rewritten by to_sql has lost its primary key, so there is no conflict target and rows are replaced by key instead
+            rows = list(rows)
+            key_idx = [cols.index(key) for key in key_cols]
+            key_conditions = ' AND '.join(f'{key} = ?' for key in key_cols)
+            self.cursor.executemany(f"DELETE FROM {table} WHERE {key_conditions};", [tuple(row[idx] for idx in key_idx) for row in rows])
+            self.cursor.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({placeholders});", rows)
+
+    def upsert(self, table, rows : dict | list[dict], key_cols : list[str]):
+        # Inserts each row, or updates the stored row with the same key_cols
+        rows = [rows] if isinstance(rows, dict) else rows
+        if self.validate_table_exists(table) and len(rows) > 0:
+            cols = list(rows[0].keys())
+            self._validate_columns(table, cols + key_cols)
+            with self.batch():
+                self._write_rows(table, cols, key_cols, [tuple(row[col] for col in cols) for row in rows])
             return True
         return False
 
     def update(self, table, data, conditions=None):
         if self.validate_table_exists(table):
+            self._validate_columns(table, list(data.keys()) + list((conditions or {}).keys()))
             exe_args = tuple(data.values())
 
             set_placeholder = ''
@@ -202,13 +459,14 @@ class RecDB:
                 exe_args = exe_args + tuple(conditions.values())
 
             query = f"UPDATE {table} SET {set_placeholder}{conditions_placeholder};"
-            self.cursor.execute(query, exe_args or ())
-            self.conn.commit()
+            with self.batch():
+                self.cursor.execute(query, exe_args or ())
             return True
         return False
 
     def delete(self, table, conditions=None):
         if self.validate_table_exists(table):
+            self._validate_columns(table, list((conditions or {}).keys()))
             exe_args = None
             conditions_placeholder = ''
             if conditions:
@@ -221,13 +479,15 @@ class RecDB:
                 exe_args = tuple(conditions.values())
             
             query = f"DELETE FROM {table}{conditions_placeholder};"
-            self.cursor.execute(query, exe_args or ())
-            self.conn.commit()
+            with self.batch():
+                self.cursor.execute(query, exe_args or ())
             return True
         return False
 
     def select(self, table, cols=None, conditions=None):
         if self.validate_table_exists(table):
+            self._validate_columns(table, list(cols or []), allow_aggregates=True)
+            self._validate_columns(table, list((conditions or {}).keys()))
             exe_args = None
             if cols is not None:
                 columns = ', '.join(cols)
@@ -251,6 +511,10 @@ class RecDB:
         return None
     
     def select_joined(self, base_table, join_clauses, select_columns='*', conditions=None, params=None):
+        # Column expressions and join conditions are free-form SQL here, so only the table names can be checked
+        if not all(self.validate_table_exists(table) for table in [base_table] + [clause[1] for clause in join_clauses]):
+            return None
+
         query = f"SELECT {select_columns} FROM {base_table}"
 
         for join_type, table, on_condition in join_clauses:
@@ -278,22 +542,132 @@ class RecDB:
     def inv_val_to_none(self, df: pd.DataFrame):
         df.replace(['', 'None', 'nan', 'NaN', np.nan, None], pd.NA, inplace=True)
     
+    def _apply_dtypes(self, table, df: pd.DataFrame) -> pd.DataFrame:
+        for col, dtype in column_dtypes.get(table, {}).items():
+            if col not in df.columns:
+                continue
+            try:
+                if dtype == 'utc_datetime':
+                    df[col] = pd.to_datetime(df[col], format='ISO8601', utc=True)
+                elif dtype == 'date':
+                    df[col] = pd.to_datetime(df[col], format='ISO8601')
+                else:
+                    df[col] = df[col].astype(dtype)
+            except (ValueError, TypeError):
+                pass    # Left as stored, for the caller's own formatting to deal with
+        return df
+
     def table_to_df(self, table_name) -> pd.DataFrame:
         df = None
         if self.validate_table_exists(table_name):
             query = f'SELECT * FROM {table_name}'
             df = pd.read_sql_query(query, self.conn)
             self.inv_val_to_none(df)
+            df = self._apply_dtypes(table_name, df)
         return df
 
+    def _to_db_param(self, value):
+        # Timestamps are compared as the same UTC text they are stored as
+        if isinstance(value, (pd.Timestamp, datetime)):
+            value = pd.Timestamp(value)
+            return (value.tz_convert('UTC') if value.tzinfo else value.tz_localize('UTC')).isoformat(sep=' ')
+        return value
+
+    def select_between(self, table, col, start=None, end=None, conditions=None, cols=None):
+        # Rows with start <= col < end that match conditions, where a condition of None matches NULL. The filtering is
+        # done by sqlite, so it is answered from an index on col (or on a condition column and col)
+        if self.validate_table_exists(table):
+            self._validate_columns(table, [col] + list(cols or []) + list((conditions or {}).keys()))
+            clauses = []
+            params = []
+            for key, value in (conditions or {}).items():
+                if value is None:
+                    clauses.append(f'{key} IS NULL')
+                else:
+                    clauses.append(f'{key} = ?')
+                    params.append(self._to_db_param(value))
+            if start is not None:
+                clauses.append(f'{col} >= ?')
+                params.append(self._to_db_param(start))
+            if end is not None:
+                clauses.append(f'{col} < ?')
+                params.append(self._to_db_param(end))
+
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+            self.cursor.execute(f"SELECT {', '.join(cols) if cols else '*'} FROM {table}{where} ORDER BY {col};", params)
+            return self.cursor.fetchall()
+        return None
+
+    def get_table_columns(self, table) -> list[str]:
+        return list(self._load_schema().get(table, []))
+
+    def upsert_df(self, table, df: pd.DataFrame, key_cols: list[str]):
+        if self.validate_table_exists(table):
+            # Only columns the stored table actually has are written
+            self._validate_columns(table, key_cols)
+            table_cols = self.get_table_columns(table)
+            cols = [col for col in df.columns if col in table_cols]
+            data = self._to_db_values(df, cols)
+
+            with self.batch():
+                self._write_rows(table, cols, key_cols, data.itertuples(index=False, name=None))
+            return True
+        return False
+
+    def _to_db_values(self, df: pd.DataFrame, cols) -> pd.DataFrame:
+        data = dict()
+        for col in cols:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                # Same text as Timestamp.isoformat(sep=' '), e.g. '2024-01-02 10:00:00+00:00'. UTC columns are formatted
+                # without their timezone and given the fixed offset, which is several times faster
+                if str(getattr(df[col].dt, 'tz', None)) == 'UTC':
+                    text = df[col].dt.tz_localize(None).astype(str) + '+00:00'
+                else:
+                    text = df[col].astype(str)
+                data[col] = text.where(df[col].notna(), None)
+            else:
+                data[col] = df[col]
+        data = pd.DataFrame(data, index=df.index).astype(object)
+        return data.where(pd.notna(data), None)
+
+    def _write_diff(self, table, cols, key_cols, data : pd.DataFrame):
+        # The frame is compared with the stored rows by primary key, so only inserted, changed and deleted rows are written
+        ordered = key_cols + [col for col in cols if col not in key_cols]
+        incoming = data[ordered].set_index(key_cols)
+        incoming = incoming[~incoming.index.duplicated(keep='last')]
+
+        # The stored rows are read back inside the write transaction rather than kept in memory between saves
+        rows = self.cursor.execute(f"SELECT {', '.join(ordered)} FROM {table};").fetchall()
+        stored = pd.DataFrame(rows, columns=ordered, dtype=object).set_index(key_cols)
+
+        is_new = ~incoming.index.isin(stored.index)
+        aligned = stored.reindex(incoming.index)
+        changed = incoming[is_new | (incoming.to_numpy() != aligned.to_numpy()).any(axis=1)]
+        deleted = stored.index[~stored.index.isin(incoming.index)]
+
+        if len(deleted) > 0:
+            key_conditions = ' AND '.join(f'{key} = ?' for key in key_cols)
+            self.cursor.executemany(f"DELETE FROM {table} WHERE {key_conditions};", [key if isinstance(key, tuple) else (key,) for key in deleted])
+        if len(changed) > 0:
+            self._write_rows(table, ordered, key_cols, changed.reset_index().itertuples(index=False, name=None))
+
     def df_to_table(self, table, df: pd.DataFrame):
+        # Makes the table hold exactly the rows of df without dropping it, so its declared schema is kept
         if self.validate_table_exists(table):
-            try:
-                df.to_sql(table, self.conn, if_exists='replace', index=False)
-                self.conn.commit()
-                return True
-            except:
-                return False
+            table_cols = self.get_table_columns(table)
+            key_cols = self._get_primary_keys(table)
+            cols = [col for col in df.columns if col in table_cols]
+            data = self._to_db_values(df, cols)
+            # A failed write is rolled back by batch() and raised to the caller, so the table never holds part of df
+            with self.batch():
+                if len(key_cols) > 0 and all(key in cols for key in key_cols) and data[key_cols].notna().all().all():
+                    self._write_diff(table, cols, key_cols, data)
+                else:
+                    # Rows without a complete key cannot be matched, so the table is rewritten
+                    self.cursor.execute(f"DELETE FROM {table};")
+                    self.cursor.executemany(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))});",
+                                            data.itertuples(index=False, name=None))
+            return True
         return False
 
     def encrypt(self, items: tuple[str | None]):